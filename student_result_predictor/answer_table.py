@@ -0,0 +1,108 @@
+"""
+Precomputed answers for the whole discrete input domain.
+
+Every feature the API accepts is an integer in a small range, so the model can
+be evaluated once for every combination at build time. The result is stored
+as one byte per cell (an index into a short list of distinct outcomes) in a
+.npy file that serving processes memory-map, turning a prediction into a
+single index lookup. Workers mapping the same file share its pages.
+
+An outcome is (label, probability, grade): with a grade regressor the cell
+indexes the pair of leaves both trees reach, so one lookup answers both
+(two bytes per cell if there are more than 256 distinct pairs).
+"""
+
+import json
+import os
+
+from features import FEATURE_RANGES
+from model_registry import file_digest
+from npy_mmap import map_npy
+
+# (feature, lowest value, highest value) in model column order
+DOMAIN = [(name, low, high) for name, low, high, _ in FEATURE_RANGES]
+
+TABLE_FILE = 'answer_table.npy'
+META_FILE = 'answer_table.json'
+FORMAT = 'answer-table/2'
+
+
+def build_answer_table(engine, model_path, out_dir, regressor=None):
+    """Evaluate the compiled tree(s) on every cell of DOMAIN and save the table."""
+    import numpy as np
+
+    if not hasattr(engine, 'outcome'):
+        raise ValueError("Answer tables are built for single-tree classifiers only")
+
+    lows = np.array([low for _, low, _ in DOMAIN])
+    shape = tuple(high - low + 1 for _, low, high in DOMAIN)
+    grid = (np.indices(shape).reshape(len(shape), -1).T + lows).astype(np.float32)
+
+    # Cells that land in the same leaf (pair of leaves) share an outcome slot
+    leaves = engine.apply(grid)
+    if regressor is not None:
+        leaves = leaves * regressor.node_count + regressor.apply(grid)
+    pairs, slots = np.unique(leaves, return_inverse=True)
+    if len(pairs) > 65536:
+        raise ValueError(f"Too many distinct outcomes for a uint16 table: {len(pairs)}")
+
+    outcomes = []
+    for pair in pairs.tolist():
+        leaf, regressor_leaf = divmod(pair, regressor.node_count) if regressor is not None else (pair, None)
+        grade = regressor.leaf_value[regressor_leaf] if regressor is not None else None
+        outcomes.append([*engine.outcome(leaf), grade])
+
+    os.makedirs(out_dir, exist_ok=True)
+    dtype = np.uint8 if len(pairs) <= 256 else np.uint16
+    np.save(os.path.join(out_dir, TABLE_FILE), slots.reshape(-1).astype(dtype))
+    meta = {
+        "format": FORMAT,
+        "domain": DOMAIN,
+        "shape": list(shape),
+        "outcomes": outcomes,
+        "model_sha256": file_digest(model_path)
+    }
+    with open(os.path.join(out_dir, META_FILE), 'w') as f:
+        json.dump(meta, f)
+    return len(slots)
+
+
+class AnswerTable:
+    """Read-only, memory-mapped view of a table written by build_answer_table."""
+
+    def __init__(self, slots, outcomes, shape):
+        self.slots = slots
+        self.outcomes = [tuple(outcome) for outcome in outcomes]
+        # (lowest value, highest value, row-major stride) per feature
+        self.axes = []
+        stride = 1
+        for (_, low, high), size in reversed(list(zip(DOMAIN, shape))):
+            self.axes.insert(0, (low, high, stride))
+            stride *= size
+
+    @classmethod
+    def load(cls, model_dir, model_path):
+        """Map the table in model_dir, or return None if it is missing or stale."""
+        table_path = os.path.join(model_dir, TABLE_FILE)
+        meta_path = os.path.join(model_dir, META_FILE)
+        if not (os.path.exists(table_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('format') != FORMAT:
+            print("Answer table has an older format, ignoring it")
+            return None
+        if meta.get('model_sha256') != file_digest(model_path):
+            print("Answer table was built from a different model, ignoring it")
+            return None
+        return cls(map_npy(table_path), meta['outcomes'], meta['shape'])
+
+    def lookup(self, features):
+        """Return (label, probability, grade) for an in-domain integer row, else None."""
+        index = 0
+        for value, (low, high, stride) in zip(features, self.axes):
+            # Range check first so NaN and infinity never reach int()
+            if not (low <= value <= high) or value != int(value):
+                return None
+            index += (int(value) - low) * stride
+        return self.outcomes[self.slots[index]]
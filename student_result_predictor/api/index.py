@@ -1,28 +1,76 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response
 import os
 import sys
+import threading
 
 # Get the base directory (project root)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from assets import install as install_assets
+from drift import DRIFT, install as install_drift
+from metrics import METRICS, install as install_metrics
+from model_registry import ModelRegistry
+from predictor import Predictor, MODEL_POLL_SECONDS
+from profiling import install as install_profiling
+from timing import RequestTimer
 
 # Simple Flask app setup for Vercel
 app = Flask(__name__, 
             template_folder=os.path.join(BASE_DIR, 'templates'),
             static_folder=os.path.join(BASE_DIR, 'static'))
 
-# Simple model loading (create a dummy model for now to test)
-try:
-    import joblib
-    import numpy as np
-    model_path = os.path.join(BASE_DIR, 'model', 'dt_model.joblib')
-    model = joblib.load(model_path) if os.path.exists(model_path) else None
-except ImportError:
-    model = None
-    joblib = None
-    np = None
+# Hashed, precompressed static files on /assets/ and the pre-rendered index page
+ASSETS = install_assets(app)
+
+# Request latency histograms and the /metrics endpoint
+install_metrics(app)
+
+# Input histograms and drift against the training data on /drift
+install_drift(app)
+
+# Flamegraph profiling of sampled requests (off unless PROFILE_SAMPLE_RATE or PROFILE_SECRET is set)
+install_profiling(app)
+
+# The model is memory-mapped from the registry on first use, so a cold start
+# only pays for importing Flask (never sklearn, joblib or NumPy)
+registry = ModelRegistry(os.path.join(BASE_DIR, 'model', 'registry'))
+_predictor = None
+_predictor_loaded = False
+_predictor_lock = threading.Lock()
+
+def _swap_model(loaded):
+    """Switch new requests to a newly activated version; in-flight ones keep the old one"""
+    global _predictor
+    _predictor = Predictor.from_loaded(loaded)
+    print(f"Switched to model {loaded.version}")
+
+def get_predictor():
+    """Return the shared Predictor, loading it on first call (None if unavailable)"""
+    global _predictor, _predictor_loaded
+    if not _predictor_loaded:
+        with _predictor_lock:
+            if not _predictor_loaded:
+                try:
+                    _predictor = Predictor.load(registry)
+                except Exception as e:
+                    print(f"Error loading model: {e}")
+                if MODEL_POLL_SECONDS > 0:
+                    registry.watch(_predictor.version if _predictor is not None else None,
+                                   _swap_model, MODEL_POLL_SECONDS)
+                _predictor_loaded = True
+    return _predictor
+
+# Optionally load the model in the background instead of on the first /predict
+if os.environ.get('PRELOAD_MODEL') == '1':
+    threading.Thread(target=get_predictor, daemon=True).start()
 
 @app.route('/')
 def index():
+    page = ASSETS.send_page('index.html')
+    if page is not None:
+        return page
     try:
         return render_template('index.html')
     except Exception as e:
@@ -48,24 +96,46 @@ def index():
         </html>
         """
 
+_result_template = None
+
+def render_result(**context):
+    """Render result.html from its compiled template, loaded once per process"""
+    global _result_template
+    if _result_template is None:
+        _result_template = app.jinja_env.get_template('result.html')
+    return _result_template.render(**context)
+
+def _form_int(name, default=None):
+    """Read one integer form field, counting a bad value as a validation failure"""
+    try:
+        return int(request.form[name] if default is None else request.form.get(name, default))
+    except (KeyError, ValueError):
+        METRICS.inc('validation_failures_total', field=name)
+        raise
+
 @app.route('/predict', methods=['POST'])
 def predict():
-    if model is None or joblib is None:
+    timer = RequestTimer()
+    predictor = get_predictor()
+    if predictor is None:
         # Simple fallback prediction logic
-        study_hours = int(request.form.get('study_hours', 0))
-        sleep_hours = int(request.form.get('sleep_hours', 0))
-        absences = int(request.form.get('absences', 0))
-        assignments_completed = int(request.form.get('assignments_completed', 0))
-        exam_score = int(request.form.get('exam_score', 0))
+        study_hours = _form_int('study_hours', 0)
+        sleep_hours = _form_int('sleep_hours', 0)
+        absences = _form_int('absences', 0)
+        assignments_completed = _form_int('assignments_completed', 0)
+        exam_score = _form_int('exam_score', 0)
+        timer.mark('parse')
         
         # Simple heuristic prediction
         score = (study_hours * 10) + (sleep_hours * 5) - (absences * 2) + (assignments_completed * 3) + (exam_score * 0.5)
         prediction = 'Pass' if score > 400 else 'Fail'
         probability = min(95, max(5, score / 6))
+        METRICS.inc('predictions_total', source='heuristic')
+        DRIFT.record([study_hours, sleep_hours, absences, assignments_completed, exam_score], prediction == 'Pass')
+        timer.mark('inference')
         
         try:
-            return render_template(
-                'result.html',
+            page = render_result(
                 prediction=prediction,
                 probability=round(probability, 2),
                 study_hours=study_hours,
@@ -74,6 +144,8 @@ def predict():
                 assignments_completed=assignments_completed,
                 exam_score=exam_score
             )
+            timer.mark('render')
+            return timer.attach(make_response(page))
         except Exception as e:
             return jsonify({
                 "prediction": prediction,
@@ -88,40 +160,58 @@ def predict():
     
     # ML model prediction (if available)
     try:
-        study_hours = int(request.form['study_hours'])
-        sleep_hours = int(request.form['sleep_hours'])
-        absences = int(request.form['absences'])
-        assignments_completed = int(request.form['assignments_completed'])
-        exam_score = int(request.form['exam_score'])
-
-        features = np.array([[study_hours, sleep_hours, absences, assignments_completed, exam_score]])
-        pred = model.predict(features)[0]
-        prob = model.predict_proba(features)[0]
+        study_hours = _form_int('study_hours')
+        sleep_hours = _form_int('sleep_hours')
+        absences = _form_int('absences')
+        assignments_completed = _form_int('assignments_completed')
+        exam_score = _form_int('exam_score')
+        timer.mark('parse')
+
+        features = [study_hours, sleep_hours, absences, assignments_completed, exam_score]
+        # One lookup answers pass/fail and, if the model has a regressor, the grade
+        pred, probability, grade = predictor.predict_one(features)
         label = 'Pass' if pred == 1 else 'Fail'
-        probability = float(prob[1]) if pred == 1 else float(prob[0])
+        METRICS.inc('predictions_total', source='model')
+        DRIFT.record(features, label == 'Pass')
+        timer.mark('inference')
 
-        return render_template(
-            'result.html',
+        page = render_result(
             prediction=label,
             probability=round(probability * 100, 2),
+            # Hidden until the regressor predicts grades better than the mean does
+            predicted_grade=round(grade, 1) if grade is not None and predictor.grade_beats_mean else None,
             study_hours=study_hours,
             sleep_hours=sleep_hours,
             absences=absences,
             assignments_completed=assignments_completed,
             exam_score=exam_score
         )
+        timer.mark('render')
+        return timer.attach(make_response(page))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/health')
+def health():
+    predictor = get_predictor()
+    return jsonify({
+        "status": "healthy",
+        "model_loaded": predictor is not None,
+        "model_version": predictor.version if predictor is not None else None,
+        "prediction_cache": predictor.cache_stats() if predictor is not None else None
+    })
+
 @app.route('/test')
 def test():
+    predictor = get_predictor()
     return jsonify({
         "status": "API is working!",
         "template_folder": app.template_folder,
         "static_folder": app.static_folder,
         "template_exists": os.path.exists(os.path.join(app.template_folder, 'index.html')),
         "static_exists": os.path.exists(os.path.join(app.static_folder, 'style.css')),
-        "model_loaded": model is not None,
+        "model_loaded": predictor is not None,
+        "prediction_cache": predictor.cache_stats() if predictor is not None else None,
         "current_dir": os.getcwd(),
         "python_version": sys.version
     })
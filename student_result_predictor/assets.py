@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Precompressed, cache-validated static assets and pre-rendered pages.
+
+`python assets.py` (build.py runs it too) writes static/assets/:
+    style.<hash>.css (.gz, .br)    every file in static/, named by its content hash
+    index.<hash>.html (.gz, .br)   PAGES pre-rendered through the app's templates
+    manifest.json                  logical name -> file, ETag and encodings, plus
+                                   the hash of every source the build read
+
+The apps load the manifest once and answer from memory. Hashed files are
+served under /assets/ with Cache-Control immutable, since a changed file gets
+a new URL; pages keep their own routes, so they are sent with no-cache and
+revalidated. Both carry a strong ETag per encoding, and a matching
+If-None-Match gets an empty 304. If a source changed after the build, the
+manifest is ignored and the apps fall back to Flask's static route and
+rendering templates per request.
+
+Brotli variants need the optional brotli (or brotlicffi) package at build
+time only; serving uses the standard library and Flask.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.path.join(BASE_DIR, 'static', 'assets')
+MANIFEST_FILE = 'manifest.json'
+FORMAT = 'assets/1'
+
+# URL prefix of the hashed files
+URL_PREFIX = '/assets/'
+# Templates rendered once at build time; everything else is rendered per request
+PAGES = ['index.html']
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+CONTENT_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.ico': 'image/x-icon',
+}
+# Compressed only when the type is text and the result is smaller
+COMPRESSIBLE = ('text/', 'image/svg+xml')
+# Preferred first; file suffix of each variant
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def brotli_module():
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return brotli
+
+
+def compress(body, content_type):
+    """{encoding: bytes} of the variants worth sending (deterministic, so hashes are stable)."""
+    if not content_type.startswith(COMPRESSIBLE):
+        return {}
+    variants = {}
+    brotli = brotli_module()
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+class Asset:
+    """One representation set of a file: identity bytes, compressed variants and their ETags."""
+
+    __slots__ = ('content_type', 'digest', 'body', 'variants')
+
+    def __init__(self, body, content_type, variants=None):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.body = body
+        self.variants = compress(body, content_type) if variants is None else variants
+
+    def etag(self, encoding=None):
+        # Strong ETags must differ between byte-different representations
+        return self.digest[:16] + (f'-{encoding}' if encoding else '')
+
+    def response(self, cache_control):
+        """Flask response negotiated on Accept-Encoding, or 304 if If-None-Match matches."""
+        from flask import Response, request
+
+        encoding = None
+        for candidate in ENCODINGS:
+            if candidate in self.variants and request.accept_encodings[candidate] > 0:
+                encoding = candidate
+                break
+        etag = self.etag(encoding)
+        headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(self.variants[encoding] if encoding else self.body,
+                                content_type=self.content_type, headers=headers)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        return response
+
+
+def content_type(name):
+    return CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream')
+
+
+def _sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# ------------------ Build ------------------ #
+
+def _write(out_dir, name, body):
+    """Write body and its compressed variants under a content-hashed name; returns its manifest entry."""
+    stem, ext = os.path.splitext(name)
+    asset = Asset(body, content_type(name))
+    file_name = f"{stem}.{asset.digest[:12]}{ext}"
+    with open(os.path.join(out_dir, file_name), 'wb') as f:
+        f.write(body)
+    for encoding, data in asset.variants.items():
+        with open(os.path.join(out_dir, file_name + ENCODINGS[encoding]), 'wb') as f:
+            f.write(data)
+    return {"file": file_name, "sha256": asset.digest, "content_type": asset.content_type,
+            "encodings": sorted(asset.variants)}
+
+
+def build(app, out_dir=ASSET_DIR, pages=PAGES):
+    """Hash and compress every static file, then pre-render pages against them; returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"format": FORMAT, "assets": {}, "pages": {}, "sources": {}}
+    for name in sorted(os.listdir(app.static_folder)):
+        path = os.path.join(app.static_folder, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            body = f.read()
+        manifest["assets"][name] = _write(out_dir, name, body)
+        manifest["sources"][os.path.relpath(path, BASE_DIR)] = manifest["assets"][name]["sha256"]
+
+    # Pages are rendered with the hashed URLs just written
+    from flask import render_template
+
+    previous = app.extensions.get('assets')
+    app.extensions['assets'] = AssetStore(out_dir, manifest)
+    try:
+        with app.test_request_context('/'):
+            for name in pages:
+                page = render_template(name).encode()
+                manifest["pages"][name] = _write(out_dir, name, page)
+                path = os.path.join(app.template_folder, name)
+                manifest["sources"][os.path.relpath(path, BASE_DIR)] = _sha256(path)
+    finally:
+        app.extensions['assets'] = previous
+
+    tmp_path = os.path.join(out_dir, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST_FILE))
+
+    # Drop files of earlier builds
+    keep = {MANIFEST_FILE}
+    for entry in list(manifest["assets"].values()) + list(manifest["pages"].values()):
+        keep.add(entry["file"])
+        keep.update(entry["file"] + ENCODINGS[encoding] for encoding in entry["encodings"])
+    for name in os.listdir(out_dir):
+        if name not in keep:
+            os.remove(os.path.join(out_dir, name))
+    return manifest
+
+
+# ------------------ Serving ------------------ #
+
+class AssetStore:
+    """The built assets and pages of one manifest, read into memory on first use."""
+
+    def __init__(self, directory=ASSET_DIR, manifest=None):
+        self.directory = directory
+        self.manifest = manifest
+        self._loaded = manifest is not None
+        self._files = {}  # hashed file name -> Asset
+
+    def _load(self):
+        self.manifest = self._read()
+        self._loaded = True
+
+    def _read(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('format') != FORMAT:
+            return None
+        stale = [path for path, digest in manifest['sources'].items()
+                 if not os.path.exists(os.path.join(BASE_DIR, path))
+                 or _sha256(os.path.join(BASE_DIR, path)) != digest]
+        if stale:
+            print(f"Assets are stale ({', '.join(stale)} changed); run python assets.py")
+            return None
+        return manifest
+
+    def _entry(self, section, name):
+        if not self._loaded:
+            self._load()
+        if self.manifest is None:
+            return None
+        return self.manifest[section].get(name)
+
+    def _asset(self, entry):
+        asset = self._files.get(entry["file"])
+        if asset is None:
+            path = os.path.join(self.directory, entry["file"])
+            with open(path, 'rb') as f:
+                body = f.read()
+            variants = {}
+            for encoding in entry["encodings"]:
+                with open(path + ENCODINGS[encoding], 'rb') as f:
+                    variants[encoding] = f.read()
+            asset = self._files[entry["file"]] = Asset(body, entry["content_type"], variants)
+        return asset
+
+    def url(self, name):
+        """Hashed URL of a static file, or None if it was not built."""
+        entry = self._entry('assets', name)
+        return URL_PREFIX + entry["file"] if entry is not None else None
+
+    def send_file(self, file_name):
+        """Response for a hashed file under URL_PREFIX, or None if it is not in the manifest."""
+        if not self._loaded:
+            self._load()
+        if self.manifest is None:
+            return None
+        for entry in self.manifest['assets'].values():
+            if entry["file"] == file_name:
+                return self._asset(entry).response(IMMUTABLE)
+        return None
+
+    def send_page(self, name):
+        """Response for a pre-rendered page, or None if it was not built."""
+        entry = self._entry('pages', name)
+        return self._asset(entry).response(REVALIDATE) if entry is not None else None
+
+
+def install(app, store=None):
+    """Serve the built assets of a Flask app under /assets/ and give templates asset_url()."""
+    from flask import abort, url_for
+
+    app.extensions['assets'] = store if store is not None else AssetStore()
+
+    def asset_url(name):
+        store = app.extensions.get('assets')
+        url = store.url(name) if store is not None else None
+        return url if url is not None else url_for('static', filename=name)
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.route(URL_PREFIX + '<name>')
+    def hashed_asset(name):
+        response = app.extensions['assets'].send_file(name)
+        if response is None:
+            abort(404)
+        return response
+
+    return app.extensions['assets']
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BASE_DIR)
+    from api.index import app as vercel_app
+
+    built = build(vercel_app)
+    for section in ('assets', 'pages'):
+        for name, entry in built[section].items():
+            print(f"{name} -> {entry['file']} ({', '.join(entry['encodings']) or 'uncompressed'})")
+    if brotli_module() is None:
+        print("brotli is not installed; only gzip variants were written (pip install brotli)")
@@ -1,25 +1,82 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import json
 import os
-import joblib
 import numpy as np
+import pandas as pd
+from werkzeug.exceptions import RequestEntityTooLarge
+from drift import DRIFT, install as install_drift
+from features import FEATURE_NAMES, FEATURE_RANGES, MESSAGE_FIELDS, validate_batch
+from metrics import METRICS, install as install_metrics
+from micro_batch import MicroBatcher
+from model_registry import ModelRegistry
+from predictor import Predictor, MODEL_POLL_SECONDS
+from profiling import install as install_profiling
+from timing import RequestTimer
 
 app = Flask(__name__)
 
 # Enable CORS for all routes (allow frontend from Vercel)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# Load the model
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(BASE_DIR, 'model', 'dt_model.joblib')
+# Request latency histograms and the /metrics endpoint
+install_metrics(app)
+
+# Input histograms and drift against the training data on /drift
+install_drift(app)
+
+# Flamegraph profiling of sampled requests (off unless PROFILE_SAMPLE_RATE or PROFILE_SECRET is set)
+install_profiling(app)
+
+# Load the active model version from the registry (memory-mapped, no pickle).
+# The predictor bundles the LRU cache, optional answer table and compiled tree.
+registry = ModelRegistry()
 
 try:
-    model = joblib.load(model_path) if os.path.exists(model_path) else None
-    print(f"Model loaded successfully from {model_path}")
+    predictor = Predictor.load(registry)
+    if predictor is not None:
+        print(f"Model {predictor.version} loaded successfully from {registry.root}")
 except Exception as e:
-    model = None
+    predictor = None
     print(f"Error loading model: {e}")
 
+def _swap_model(loaded):
+    """Switch new requests to a newly activated version; in-flight ones keep the old one"""
+    global predictor
+    predictor = Predictor.from_loaded(loaded)
+    print(f"Switched to model {loaded.version}")
+
+if MODEL_POLL_SECONDS > 0:
+    registry.watch(predictor.version if predictor is not None else None, _swap_model, MODEL_POLL_SECONDS)
+
+# Concurrent /predict calls arriving within this many milliseconds share one
+# vectorized model call (0 disables micro-batching; needs a threaded worker).
+# Off by default and not recommended: see Micro-batching in DEPLOYMENT_GUIDE.md
+MICRO_BATCH_WINDOW_MS = float(os.environ.get('MICRO_BATCH_WINDOW_MS', 0))
+# Most rows answered by one micro-batch
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+
+# Reads the global predictor per batch, so hot swaps apply to the next batch
+batcher = MicroBatcher(
+    lambda rows: predictor.predict_many(rows), MICRO_BATCH_WINDOW_MS / 1000, MICRO_BATCH_MAX_SIZE
+) if MICRO_BATCH_WINDOW_MS > 0 else None
+
+# Largest number of rows accepted by /predict/batch (JSON array or CSV upload)
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 100000))
+# Bodies are refused with 413 before parsing once they exceed MAX_BATCH_SIZE rows
+# of this many bytes (a pretty-printed JSON row is about 150)
+MAX_ROW_BYTES = int(os.environ.get('MAX_ROW_BYTES', 256))
+app.config['MAX_CONTENT_LENGTH'] = MAX_BATCH_SIZE * MAX_ROW_BYTES + 64 * 1024
+# Batches with more rows than this are streamed back instead of built in memory
+STREAM_THRESHOLD = int(os.environ.get('BATCH_STREAM_THRESHOLD', 1000))
+# Number of result rows serialized per streamed chunk
+STREAM_CHUNK_ROWS = 500
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Request body too large: at most {MAX_BATCH_SIZE} rows allowed"}), 413
+
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({
@@ -28,7 +85,11 @@ def home():
         "endpoints": {
             "/": "API information",
             "/predict": "POST - Make prediction",
-            "/health": "GET - Health check"
+            "/predict/batch": f"POST - Predict a JSON array or CSV upload (max {MAX_BATCH_SIZE} rows)",
+            "/predict/sweep": "POST - What-if grid over one or two features of a base student",
+            "/health": "GET - Health check",
+            "/metrics": "GET - Prometheus metrics",
+            "/drift": "GET - Input distribution and drift against the training data"
         }
     })
 
@@ -36,57 +97,82 @@ def home():
 def health():
     return jsonify({
         "status": "healthy",
-        "model_loaded": model is not None
+        "model_loaded": predictor is not None,
+        "model_version": predictor.version if predictor is not None else None,
+        "prediction_cache": predictor.cache_stats() if predictor is not None else None,
+        "micro_batch": batcher.stats() if batcher is not None else None
     })
 
+def _parse_features(data, skip=()):
+    """Read the feature values of one student (missing ones default to 0); returns (values, error)."""
+    values = []
+    for name in FEATURE_NAMES:
+        if name in skip:
+            values.append(0.0)
+            continue
+        try:
+            values.append(float(data.get(name, 0)))
+        except (TypeError, ValueError):
+            METRICS.inc('validation_failures_total', field=name)
+            return None, f"Invalid input: {name} must be a number"
+    return values, None
+
+def _validate_features(values, skip=()):
+    """Range-check one student's values; returns the first error message or None."""
+    for value, (name, low, high, message) in zip(values, FEATURE_RANGES):
+        if name not in skip and not (low <= value <= high):
+            METRICS.inc('validation_failures_total', field=name)
+            return message
+    return None
+
 @app.route('/predict', methods=['POST'])
 def predict():
+    timer = RequestTimer()
     try:
         # Get JSON data from request
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
         # Extract features
-        study_hours = float(data.get('study_hours', 0))
-        sleep_hours = float(data.get('sleep_hours', 0))
-        absences = float(data.get('absences', 0))
-        assignments_completed = float(data.get('assignments_completed', 0))
-        exam_score = float(data.get('exam_score', 0))
+        values, error = _parse_features(data)
+        if error:
+            return jsonify({"error": error}), 400
+        study_hours, sleep_hours, absences, assignments_completed, exam_score = values
+        timer.mark('parse')
         
         # Validate inputs
-        if not (0 <= study_hours <= 8):
-            return jsonify({"error": "Study hours must be between 0 and 8"}), 400
-        if not (4 <= sleep_hours <= 9):
-            return jsonify({"error": "Sleep hours must be between 4 and 9"}), 400
-        if not (0 <= absences <= 20):
-            return jsonify({"error": "Absences must be between 0 and 20"}), 400
-        if not (0 <= assignments_completed <= 20):
-            return jsonify({"error": "Assignments must be between 0 and 20"}), 400
-        if not (40 <= exam_score <= 100):
-            return jsonify({"error": "Exam score must be between 40 and 100"}), 400
+        error = _validate_features(values)
+        if error:
+            return jsonify({"error": error}), 400
+        timer.mark('validate')
         
         # Make prediction
-        if model is not None:
+        if predictor is not None:
             # Use ML model
-            features = np.array([[study_hours, sleep_hours, absences, assignments_completed, exam_score]])
-            pred = model.predict(features)[0]
-            prob = model.predict_proba(features)[0]
-            
+            # One call answers pass/fail and, if the model has a regressor, the grade
+            pred, prob, grade = batcher.submit(values) if batcher is not None else predictor.predict_one(values)
+
             prediction = 'Pass' if pred == 1 else 'Fail'
-            probability = float(prob[1] * 100) if pred == 1 else float(prob[0] * 100)
+            probability = prob * 100
+            METRICS.inc('predictions_total', source='model')
         else:
             # Fallback heuristic prediction
             score = (study_hours * 10) + (sleep_hours * 5) - (absences * 2) + (assignments_completed * 3) + (exam_score * 0.5)
             prediction = 'Pass' if score > 400 else 'Fail'
             probability = min(95, max(5, score / 6))
+            grade = None
+            METRICS.inc('predictions_total', source='heuristic')
+        DRIFT.record(values, prediction == 'Pass')
+        timer.mark('inference')
         
         # Return prediction result
-        return jsonify({
+        response = jsonify({
             "success": True,
             "prediction": prediction,
             "probability": round(probability, 2),
+            "predicted_grade": round(grade, 1) if grade is not None else None,
             "input": {
                 "study_hours": study_hours,
                 "sleep_hours": sleep_hours,
@@ -95,12 +181,218 @@ def predict():
                 "exam_score": exam_score
             }
         })
+        timer.mark('render')
+        return timer.attach(response)
         
+    except RequestEntityTooLarge:
+        raise
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
+
+def _batch_from_json(rows):
+    """Build a float feature matrix from a list of JSON objects.
+
+    Missing fields default to 0 like the single-row endpoint; anything that
+    cannot be converted to a number becomes NaN and is reported per row.
+    """
+    columns = {}
+    for name in FEATURE_NAMES:
+        columns[name] = [row.get(name, 0) if isinstance(row, dict) else None for row in rows]
+    frame = pd.DataFrame(columns, columns=FEATURE_NAMES)
+    return frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _batch_from_csv(stream):
+    """Build a float feature matrix from an uploaded students.csv-style file."""
+    frame = pd.read_csv(stream, nrows=MAX_BATCH_SIZE + 1)
+    missing = [name for name in FEATURE_NAMES if name not in frame.columns]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    frame = frame[FEATURE_NAMES]
+    return frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _score_batch(features, predictor, counter='predictions_total'):
+    """Score a validated feature matrix, returning labels, probabilities (%) and grades (or None).
+
+    Each row is added to `counter`; sweeps count their cells apart from real predictions.
+    """
+    grades = None
+    if predictor is not None:
+        labels, prob, grades = predictor.predict_matrix(features)
+        passed = labels == 1
+        probability = prob * 100
+        METRICS.inc(counter, len(features), source='model')
+    else:
+        study_hours, sleep_hours, absences, assignments_completed, exam_score = features.T
+        score = (study_hours * 10) + (sleep_hours * 5) - (absences * 2) + (assignments_completed * 3) + (exam_score * 0.5)
+        passed = score > 400
+        probability = np.clip(score / 6, 5, 95)
+        METRICS.inc(counter, len(features), source='heuristic')
+    return passed, np.round(probability, 2), np.round(grades, 1) if grades is not None else None
+
+
+def _record_drift(features, passed):
+    """Add a validated batch to the drift histograms with one bincount per feature."""
+    if len(features) == 0:
+        return
+    counts = np.concatenate([
+        np.bincount(features[:, col].astype(np.intp) - low, minlength=high - low + 1)
+        for col, (_, low, high, _) in enumerate(FEATURE_RANGES)
+    ])
+    DRIFT.add(counts.tolist(), len(features), int(passed.sum()))
+
+
+def _batch_results(n_rows, valid, errors, passed, probability, grades):
+    """Yield one result dict per input row, in input order."""
+    scored = np.flatnonzero(valid)
+    position = np.full(n_rows, -1)
+    position[scored] = np.arange(len(scored))
+    for row in range(n_rows):
+        if valid[row]:
+            i = position[row]
+            yield {
+                "row": row,
+                "prediction": 'Pass' if passed[i] else 'Fail',
+                "probability": float(probability[i]),
+                "predicted_grade": float(grades[i]) if grades is not None else None
+            }
+        else:
+            yield {"row": row, "errors": errors[row]}
+
+
+def _stream_batch(summary, results):
+    """Stream the batch response as JSON, serializing a chunk of rows at a time."""
+    yield json.dumps(summary)[:-1] + ', "results": ['
+    first = True
+    chunk = []
+    for result in results:
+        chunk.append(json.dumps(result))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield ('' if first else ',') + ','.join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ('' if first else ',') + ','.join(chunk)
+    yield ']}'
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict many students in one request.
+
+    Accepts either a JSON array of objects shaped like the /predict body
+    (optionally wrapped as {"students": [...]}) or a multipart upload with a
+    ``file`` field in the students.csv column layout. At most MAX_BATCH_SIZE
+    rows are accepted. Invalid rows are reported in place with their errors;
+    responses larger than STREAM_THRESHOLD rows are streamed.
+    """
+    try:
+        if 'file' in request.files:
+            features = _batch_from_csv(request.files['file'].stream)
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get('students')
+            if not isinstance(data, list):
+                return jsonify({"error": "Expected a JSON array of students or a CSV file upload"}), 400
+            if len(data) > MAX_BATCH_SIZE:
+                return jsonify({"error": f"Batch too large: at most {MAX_BATCH_SIZE} rows allowed"}), 413
+            features = _batch_from_json(data)
+
+        n_rows = len(features)
+        if n_rows == 0:
+            return jsonify({"error": "No data provided"}), 400
+        if n_rows > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large: at most {MAX_BATCH_SIZE} rows allowed"}), 413
+
+        valid, errors = validate_batch(features)
+        for messages in errors.values():
+            for message in messages:
+                METRICS.inc('validation_failures_total', field=MESSAGE_FIELDS[message])
+        passed, probability, grades = _score_batch(features[valid], predictor) if valid.any() else (np.array([], dtype=bool), np.array([]), None)
+        _record_drift(features[valid], passed)
+
+        summary = {
+            "success": True,
+            "count": n_rows,
+            "valid": int(valid.sum()),
+            "invalid": len(errors)
+        }
+        results = _batch_results(n_rows, valid, errors, passed, probability, grades)
+        if n_rows > STREAM_THRESHOLD:
+            return Response(stream_with_context(_stream_batch(summary, results)),
+                            mimetype='application/json')
+        return jsonify({**summary, "results": list(results)})
+
+    except RequestEntityTooLarge:
+        # Raised when the body is first read, before it is parsed; answered by request_too_large
+        raise
     except ValueError as e:
         return jsonify({"error": f"Invalid input: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
 
+@app.route('/predict/sweep', methods=['POST'])
+def predict_sweep():
+    """What-if grid: vary one or two features of a base student over their valid ranges.
+
+    Body: {"student": {...same fields as /predict...}, "vary": ["study_hours", "absences"]}.
+    Every combination of the varied features' integer values (e.g. 9 x 21
+    cells) is scored in one vectorized call. The response holds each varied
+    feature's values and matrices indexed [first value][second value] (flat
+    lists for one feature) of pass flags, probabilities (%) and, if the model
+    has a regressor, predicted grades.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "No data provided"}), 400
+        vary = data.get('vary')
+        if isinstance(vary, str):
+            vary = [vary]
+        if (not isinstance(vary, list) or not 1 <= len(vary) <= 2
+                or not all(isinstance(name, str) for name in vary)
+                or len(set(vary)) != len(vary) or any(name not in FEATURE_NAMES for name in vary)):
+            return jsonify({"error": f"vary must name one or two of: {', '.join(FEATURE_NAMES)}"}), 400
+
+        # The base student is checked like /predict, except for the fields being varied
+        student = data.get('student', {})
+        if not isinstance(student, dict):
+            return jsonify({"error": "student must be an object"}), 400
+        base, error = _parse_features(student, skip=vary)
+        if error is None:
+            error = _validate_features(base, skip=vary)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # One row per cell in row-major order: the base student with the varied columns filled in
+        columns = [FEATURE_NAMES.index(name) for name in vary]
+        axes = [np.arange(FEATURE_RANGES[col][1], FEATURE_RANGES[col][2] + 1) for col in columns]
+        shape = tuple(len(axis) for axis in axes)
+        grid = np.tile(np.asarray(base, dtype=np.float64), (int(np.prod(shape)), 1))
+        for col, values in zip(columns, np.meshgrid(*axes, indexing='ij')):
+            grid[:, col] = values.reshape(-1)
+
+        passed, probability, grades = _score_batch(grid, predictor, counter='sweep_cells_total')
+        response = {
+            "success": True,
+            "student": {name: value for name, value in zip(FEATURE_NAMES, base) if name not in vary},
+            "vary": vary,
+            "values": {name: axis.tolist() for name, axis in zip(vary, axes)},
+            "passed": passed.reshape(shape).astype(int).tolist(),
+            "probability": probability.reshape(shape).tolist(),
+            "predicted_grade": grades.reshape(shape).tolist() if grades is not None else None
+        }
+        return jsonify(response)
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
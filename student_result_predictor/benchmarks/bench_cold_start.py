@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the serverless entry point.
+
+Starts a fresh interpreter per run, imports the app module under
+``python -X importtime`` and sends the first /predict through the Flask test
+client, recording the import time, the time to the first response and the
+slowest top-level imports. Results are appended to a JSON file under a label,
+so runs from different revisions can be compared side by side.
+
+Usage:
+    python benchmarks/bench_cold_start.py --label after
+    python benchmarks/bench_cold_start.py --root /path/to/old/checkout --label before
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'benchmarks', 'results', 'cold_start.json')
+
+# Runs inside the fresh interpreter; prints one JSON line on stdout
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from {module} import app
+imported = time.perf_counter()
+response = app.test_client().post('/predict', data={{
+    'study_hours': 5, 'sleep_hours': 7, 'absences': 2,
+    'assignments_completed': 8, 'exam_score': 85}})
+answered = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'first_predict_ms': (answered - imported) * 1000,
+    'status': response.status_code,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'numpy_imported': 'numpy' in sys.modules,
+}}))
+"""
+
+
+def parse_importtime(stderr, top):
+    """Return the costliest packages from -X importtime output.
+
+    Self time is summed per top-level package (numpy.core counts towards
+    numpy), which shows what each dependency costs regardless of who imported it.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line.split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us.split(':')[-1])
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": name, "self_ms": round(us / 1000, 2)} for name, us in slowest]
+
+
+def run_once(root, module):
+    """Cold-start the app once, returning timings and the raw importtime log."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', CHILD.format(module=module)],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--root', default=BASE_DIR, help="project directory to benchmark")
+    parser.add_argument('--module', default='api.index', help="module exporting the Flask app")
+    parser.add_argument('--label', required=True, help="name to store the results under")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="costliest packages to record")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    runs = []
+    stderr = ''
+    for _ in range(args.runs):
+        timings, stderr = run_once(args.root, args.module)
+        runs.append(timings)
+
+    import_ms = [run['import_ms'] for run in runs]
+    first_ms = [run['first_predict_ms'] for run in runs]
+    total_ms = [a + b for a, b in zip(import_ms, first_ms)]
+    summary = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(import_ms), 2),
+        "first_predict_ms_median": round(statistics.median(first_ms), 2),
+        "cold_start_ms_median": round(statistics.median(total_ms), 2),
+        "sklearn_imported": runs[-1]['sklearn_imported'],
+        "numpy_imported": runs[-1]['numpy_imported'],
+        "slowest_imports": parse_importtime(stderr, args.top)
+    }
+
+    print(f"{args.label}: import {summary['import_ms_median']} ms, "
+          f"first /predict {summary['first_predict_ms_median']} ms, "
+          f"cold start {summary['cold_start_ms_median']} ms "
+          f"(sklearn imported: {summary['sklearn_imported']})")
+    for entry in summary['slowest_imports']:
+        print(f"  {entry['self_ms']:9.2f} ms  {entry['package']}")
+
+    results = {}
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            results = json.load(f)
+    results[args.label] = summary
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Load time and peak memory of the training data: CSV parse vs columnar cache.
+
+Generates a synthetic students CSV (or uses --csv) and, each in a fresh
+interpreter so peak RSS is not shared between runs, measures
+train_model.load_dataset:
+
+    csv         parse the CSV directly (--no-cache behaviour)
+    cache_cold  first run: parse once and write the columnar cache
+    cache_warm  later runs: memory-map the cached columns
+
+Each run reports the time to get X and y back, the time for one full pass over
+X as training would do, and the process's peak RSS.
+
+Usage:
+    python benchmarks/bench_dataset_cache.py --rows 5000000
+    python benchmarks/bench_dataset_cache.py --csv data/students.csv
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'benchmarks', 'results', 'dataset_cache.json')
+
+# Runs inside the fresh interpreter; prints one JSON line on stdout
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {base_dir!r})
+import contextlib, io
+from train_model import load_dataset
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    X, y_class, y_reg = load_dataset({csv!r}, {cache_dir!r})
+loaded = time.perf_counter()
+total = int(X.to_numpy().sum()) + int(y_class.sum())
+touched = time.perf_counter()
+print(json.dumps({{
+    'rows': len(X),
+    'load_seconds': round(loaded - start, 4),
+    'load_and_scan_seconds': round(touched - start, 4),
+    'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    'X_bytes': int(X.memory_usage(index=False).sum()),
+}}))
+"""
+
+
+def run(csv_path, cache_dir):
+    code = CHILD.format(base_dir=BASE_DIR, csv=csv_path, cache_dir=cache_dir)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV and cached training-data loading")
+    parser.add_argument('--csv', help="existing students CSV (default: generate one)")
+    parser.add_argument('--rows', type=int, default=2_000_000, help="rows to generate when --csv is not given")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-dataset-cache-')
+    try:
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = os.path.join(workdir, 'students.csv')
+            subprocess.run([sys.executable, os.path.join(BASE_DIR, 'generate_students.py'),
+                            '--rows', str(args.rows), '--output', csv_path], check=True, stdout=subprocess.DEVNULL)
+        csv_bytes = os.path.getsize(csv_path)
+        cache_dir = os.path.join(workdir, 'cache')
+
+        results = {
+            "csv": run(csv_path, None),
+            "cache_cold": run(csv_path, cache_dir),
+            "cache_warm": run(csv_path, cache_dir),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'':12s} {'load s':>8s} {'load+scan s':>12s} {'peak RSS MB':>12s} {'X MB':>8s}")
+    for name, result in results.items():
+        print(f"{name:12s} {result['load_seconds']:8.3f} {result['load_and_scan_seconds']:12.3f} "
+              f"{result['peak_rss_mb']:12.1f} {result['X_bytes'] / 1e6:8.1f}")
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "csv": args.csv or f"generated, {args.rows} rows",
+        "csv_bytes": csv_bytes,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Open-loop load test of backend_api.py, to find its saturation point locally.
+
+Starts the API under gunicorn with the production gunicorn.conf.py (or
+targets one already listening on --port) and replays /predict payloads drawn
+from students.csv or a dataset written by generate_students.py. A share of
+the requests are invalid (out of range, not a number, empty, malformed JSON),
+which must be answered with 400. Another share repeat a small hot set of
+tuples, the way real traffic hits the prediction cache.
+
+The offered rate ramps up in steps. Each step sends on a fixed arrival
+schedule (Poisson by default), whatever the server's response times, and
+latency is measured from each request's scheduled send time. A slow server
+therefore shows up as queueing rather than as a quietly lowered rate (the
+coordinated omission of closed-loop clients). A request fails when its status
+differs from the expected one, the connection fails, or it is still
+unanswered --drain-seconds after the step. A step is sustainable when its p99
+is within --p99-target-ms and its error rate within --max-error-rate. The
+report gives the highest sustainable offered rate.
+
+The generator runs on the same machine as the server and competes with it for
+the CPU. Steps where it fell behind its own schedule are marked
+generator-limited.
+
+Usage:
+    python benchmarks/bench_load.py --p99-target-ms 50
+    python benchmarks/bench_load.py --workers 4 --start-rps 200 --step-rps 200 --max-rps 4000
+    python benchmarks/bench_load.py --csv data/students.csv --invalid-share 0.2 --repeat-share 0.5
+"""
+
+import argparse
+import csv
+import http.client
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from bench_serving import BASE_DIR, FEATURES, HttpSender, git_revision, percentile, start_gunicorn
+
+sys.path.insert(0, BASE_DIR)
+from features import FEATURE_RANGES  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'benchmarks', 'results', 'load.json')
+INVALID_KINDS = ['out_of_range', 'not_a_number', 'empty', 'malformed_json']
+# Distinct requests prepared up front and cycled through
+POOL_SIZE = 20000
+
+
+# ------------------ Payloads ------------------ #
+
+def load_rows(csv_path, max_rows):
+    """Feature dicts of up to max_rows rows of a students.csv-style file."""
+    rows = []
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                rows.append({name: int(float(row[name])) for name in FEATURES})
+            except (KeyError, TypeError, ValueError):
+                continue
+            if len(rows) >= max_rows:
+                break
+    if not rows:
+        raise SystemExit(f"No usable rows in {csv_path}")
+    return rows
+
+
+def in_range(payload):
+    return all(low <= payload[name] <= high for name, low, high, _ in FEATURE_RANGES)
+
+
+def invalid_body(kind, payload, rng):
+    """JSON body of one invalid request of the given kind."""
+    payload = dict(payload)
+    name, low, high, _ = rng.choice(FEATURE_RANGES)
+    if kind == 'out_of_range':
+        payload[name] = high + rng.randint(1, 10) if rng.random() < 0.5 else low - rng.randint(1, 10)
+    elif kind == 'not_a_number':
+        payload[name] = rng.choice(['abc', '', 'NaN?', [1, 2]])
+    elif kind == 'empty':
+        return b'{}'
+    elif kind == 'malformed_json':
+        return json.dumps(payload)[:-2].encode()
+    return json.dumps(payload).encode()
+
+
+def build_requests(rows, invalid_share, repeat_share, hot_set, seed):
+    """POOL_SIZE (body, expected status, kind) tuples in a reproducible order."""
+    rng = random.Random(seed)
+    hot = [rng.choice(rows) for _ in range(hot_set)]
+    requests = []
+    for _ in range(POOL_SIZE):
+        draw = rng.random()
+        if draw < invalid_share:
+            kind = rng.choice(INVALID_KINDS)
+            requests.append((invalid_body(kind, rng.choice(rows), rng), 400, 'invalid'))
+            continue
+        kind = 'repeat' if draw < invalid_share + repeat_share else 'sample'
+        payload = rng.choice(hot) if kind == 'repeat' else rng.choice(rows)
+        requests.append((json.dumps(payload).encode(), 200 if in_range(payload) else 400, kind))
+    return requests
+
+
+# ------------------ Open-loop steps ------------------ #
+
+def run_step(send, requests, offset, rate, seconds, connections, drain_seconds, poisson, rng):
+    """Offer `rate` requests/s for `seconds` on a fixed schedule; returns the step summary."""
+    records = []  # (latency from scheduled send, status, expected); list.append is thread-safe
+
+    def fire(scheduled, body, expected):
+        try:
+            status, _ = send(body, 'application/json')
+        except (OSError, http.client.HTTPException):
+            status = 'error'
+        records.append((time.perf_counter() - scheduled, status, expected))
+
+    pool = ThreadPoolExecutor(max_workers=connections)
+    sent = 0
+    max_lag = 0.0
+    start = time.perf_counter() + 0.05
+    scheduled = start
+    end = start + seconds
+    while scheduled < end:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+        body, expected, _ = requests[(offset + sent) % len(requests)]
+        pool.submit(fire, scheduled, body, expected)
+        sent += 1
+        scheduled += rng.expovariate(rate) if poisson else 1 / rate
+    dispatched = time.perf_counter() - start
+
+    deadline = time.perf_counter() + drain_seconds
+    while len(records) < sent and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    # Requests still queued are dropped; ones in flight finish but are not counted
+    answered = records[:]
+    pool.shutdown(wait=True, cancel_futures=True)
+    dropped = sent - len(answered)
+
+    latencies = sorted(latency for latency, _, _ in answered)
+    statuses = {}
+    errors = dropped
+    for _, status, expected in answered:
+        statuses[status] = statuses.get(status, 0) + 1
+        errors += status != expected
+    if dropped:
+        statuses['dropped'] = dropped
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "offered_rps": rate,
+        "sent": sent,
+        "achieved_rps": round(len(answered) / elapsed, 1),
+        "error_rate": round(errors / sent, 4) if sent else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p90": ms(percentile(latencies, 90)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+        "status_codes": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "max_dispatch_lag_ms": ms(max_lag),
+        # Still submitting well after the schedule ended: the client, not the server, set the pace
+        "generator_limited": dispatched > seconds * 1.05,
+    }, sent
+
+
+def ramp_rates(start, step, maximum):
+    rates = []
+    rate = start
+    while rate <= maximum:
+        rates.append(rate)
+        rate += step
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the maximum sustainable /predict throughput of backend_api.py")
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'students.csv'),
+                        help="payloads to replay (students.csv or a generate_students.py CSV)")
+    parser.add_argument('--max-rows', type=int, default=100000, help="rows read from --csv")
+    parser.add_argument('--invalid-share', type=float, default=0.05, help="fraction of invalid requests")
+    parser.add_argument('--repeat-share', type=float, default=0.3, help="fraction drawn from the hot set")
+    parser.add_argument('--hot-set', type=int, default=20, help="distinct tuples in the hot set")
+    parser.add_argument('--start-rps', type=float, default=100)
+    parser.add_argument('--step-rps', type=float, default=100)
+    parser.add_argument('--max-rps', type=float, default=3000)
+    parser.add_argument('--step-seconds', type=float, default=5)
+    parser.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson')
+    parser.add_argument('--p99-target-ms', type=float, default=50)
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--patience', type=int, default=2,
+                        help="stop after this many unsustainable steps in a row")
+    parser.add_argument('--connections', type=int, default=64, help="most requests in flight")
+    parser.add_argument('--drain-seconds', type=float, default=10,
+                        help="how long to wait for a step's last responses")
+    parser.add_argument('--warmup', type=int, default=300, help="requests sent before the ramp")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=1, help="threads per gunicorn worker")
+    parser.add_argument('--port', type=int, help="target an API already listening on this port")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    rows = load_rows(args.csv, args.max_rows)
+    requests = build_requests(rows, args.invalid_share, args.repeat_share, args.hot_set, args.seed)
+    rng = random.Random(args.seed)
+
+    process = None
+    port = args.port
+    if port is None:
+        # Access logging is turned off, so it does not eat into the measured capacity
+        process, port = start_gunicorn('backend_api', args.workers, extra_args=['--access-logfile', os.devnull],
+                                       env={'GUNICORN_THREADS': str(args.threads)},
+                                       config=os.path.join(BASE_DIR, 'gunicorn.conf.py'))
+    send = HttpSender(port)
+    steps = []
+    try:
+        for i in range(args.warmup):
+            body, _, _ = requests[i % len(requests)]
+            send(body, 'application/json')
+
+        offset = args.warmup
+        misses = 0
+        print(f"{'offered':>8s} {'achieved':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'errors':>7s}")
+        for rate in ramp_rates(args.start_rps, args.step_rps, args.max_rps):
+            step, sent = run_step(send, requests, offset, rate, args.step_seconds, args.connections,
+                                  args.drain_seconds, args.arrivals == 'poisson', rng)
+            offset += sent
+            latency = step['latency_ms']
+            step['sustainable'] = (
+                latency['p99'] is not None and latency['p99'] <= args.p99_target_ms
+                and step['error_rate'] <= args.max_error_rate
+            )
+            steps.append(step)
+            print(f"{rate:8.0f} {step['achieved_rps']:9.1f} {latency['p50'] or 0:8.2f} {latency['p99'] or 0:8.2f} "
+                  f"{step['error_rate']:7.2%}  {'ok' if step['sustainable'] else 'over target'}"
+                  f"{'  (generator-limited)' if step['generator_limited'] else ''}")
+            misses = 0 if step['sustainable'] else misses + 1
+            if misses >= args.patience:
+                break
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    sustainable = [step for step in steps if step['sustainable']]
+    best = max(sustainable, key=lambda step: step['offered_rps']) if sustainable else None
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "csv": args.csv, "rows": len(rows), "invalid_share": args.invalid_share,
+            "repeat_share": args.repeat_share, "hot_set": args.hot_set, "arrivals": args.arrivals,
+            "step_seconds": args.step_seconds, "p99_target_ms": args.p99_target_ms,
+            "max_error_rate": args.max_error_rate, "connections": args.connections,
+            "workers": None if args.port else args.workers, "threads": None if args.port else args.threads,
+        },
+        "max_sustainable_rps": best['offered_rps'] if best else None,
+        "steps": steps,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+    if best is None:
+        print(f"No step met p99 <= {args.p99_target_ms} ms with at most {args.max_error_rate:.1%} errors")
+    else:
+        print(f"Maximum sustainable throughput: {best['offered_rps']:.0f} req/s "
+              f"(p99 {best['latency_ms']['p99']} ms, errors {best['error_rate']:.2%})")
+
+
+if __name__ == '__main__':
+    main()
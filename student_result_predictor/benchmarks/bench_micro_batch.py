@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load test for micro-batched /predict on backend_api.py.
+
+Starts backend_api under gunicorn with threaded workers (-k gthread), once
+per micro-batch window (0 = batching off), and drives /predict over HTTP at
+each concurrency level. Every response is checked against the unbatched
+answer for the same payload, so the JSON contract is verified along the way.
+Throughput and latency per window and concurrency are printed and saved.
+
+Usage:
+    python benchmarks/bench_micro_batch.py
+    python benchmarks/bench_micro_batch.py --windows 0 1 2 5 --concurrency 1 8 32 64 --no-cache
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+from bench_serving import BASE_DIR, HttpSender, encode, load_payloads, run_level, start_gunicorn
+
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'benchmarks', 'results', 'micro_batch.json')
+
+
+def fetch(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def answers(port, payloads):
+    """(prediction, probability) for each distinct payload, one request at a time."""
+    results = []
+    for payload in payloads:
+        _, body = fetch(port, 'POST', '/predict', encode(payload, 'json')[0])
+        results.append((body['prediction'], body['probability']))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test micro-batched /predict")
+    parser.add_argument('--windows', type=float, nargs='+', default=[0, 2], help="MICRO_BATCH_WINDOW_MS values")
+    parser.add_argument('--max-size', type=int, default=64, help="MICRO_BATCH_MAX_SIZE")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=3000, help="requests per concurrency level")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=64, help="threads per gunicorn worker")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="disable the prediction cache so every row reaches the model")
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'students.csv'))
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.csv, repeat=False)
+    bodies = [encode(payload, 'json') for payload in payloads]
+    expected = None
+    results = {}
+
+    for window in args.windows:
+        env = {'MICRO_BATCH_WINDOW_MS': str(window), 'MICRO_BATCH_MAX_SIZE': str(args.max_size)}
+        if args.no_cache:
+            env['PREDICTION_CACHE_SIZE'] = '0'
+        process, port = start_gunicorn('backend_api', args.workers,
+                                       ['-k', 'gthread', '--threads', str(args.threads)], env)
+        try:
+            got = answers(port, payloads[:200])
+            if expected is None:
+                expected = got
+            elif got != expected:
+                sys.exit(f"window={window}ms: responses differ from window={args.windows[0]}ms")
+
+            send = HttpSender(port)
+            run_level(send, bodies, 200, 4)  # warm-up
+            levels = {}
+            for concurrency in args.concurrency:
+                summary = run_level(send, bodies, args.requests, concurrency)
+                levels[str(concurrency)] = summary
+                latency = summary['latency_ms']
+                print(f"  window {window:>4g} ms  c={concurrency:<3d} {summary['req_per_sec']:>9,.1f} req/s  "
+                      f"p50 {latency['p50']:.3f}  p99 {latency['p99']:.3f} ms  {summary['status_codes']}")
+            levels['micro_batch'] = fetch(port, 'GET', '/health')[1]['micro_batch']
+            if levels['micro_batch']:
+                print(f"  window {window:>4g} ms  mean batch size {levels['micro_batch']['mean_batch_size']}")
+            results[f"{window:g}"] = levels
+        finally:
+            process.terminate()
+            process.wait()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "cpu_count": os.cpu_count(),
+        "config": {"workers": args.workers, "threads": args.threads, "max_size": args.max_size,
+                   "requests": args.requests, "prediction_cache": not args.no_cache},
+        "windows_ms": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-worker memory of backend_api.py under gunicorn, with and without preload.
+
+Starts gunicorn twice with the same number of workers: once plainly (each
+worker imports the app itself) and once with gunicorn.conf.py (app loaded in
+the master, gc frozen, workers forked). After warming every worker with
+/predict traffic it reads /proc/<pid>/smaps_rollup for each worker and
+reports RSS, PSS and USS (private pages only, i.e. what the worker costs on
+top of what it shares). Linux only.
+
+Usage:
+    python benchmarks/bench_prefork_memory.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from bench_serving import BASE_DIR, HttpSender, encode, load_payloads, run_level, start_gunicorn
+
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'benchmarks', 'results', 'prefork_memory.json')
+
+
+def memory_mb(pid):
+    """RSS, PSS and USS of one process in MB, from smaps_rollup."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    uss = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {
+        "rss_mb": round(fields.get('Rss', 0) / 1024, 1),
+        "pss_mb": round(fields.get('Pss', 0) / 1024, 1),
+        "uss_mb": round(uss / 1024, 1),
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def measure(label, workers, config, bodies, requests):
+    process, port = start_gunicorn('backend_api', workers, ['--access-logfile', '/dev/null'],
+                                   {'WEB_CONCURRENCY': str(workers)}, config)
+    try:
+        deadline = time.monotonic() + 30
+        while len(children(process.pid)) < workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+        # Enough concurrent traffic that every worker serves (and collects)
+        run_level(HttpSender(port), bodies, requests, workers * 2)
+        master = memory_mb(process.pid)
+        per_worker = [memory_mb(pid) for pid in children(process.pid)]
+    finally:
+        process.terminate()
+        process.wait()
+
+    total_pss = master['pss_mb'] + sum(w['pss_mb'] for w in per_worker)
+    mean_uss = sum(w['uss_mb'] for w in per_worker) / len(per_worker)
+    print(f"{label}: master {master}")
+    for i, worker in enumerate(per_worker):
+        print(f"  worker {i}: {worker}")
+    print(f"  mean worker USS {mean_uss:.1f} MB, total PSS {total_pss:.1f} MB")
+    return {"master": master, "workers": per_worker,
+            "mean_worker_uss_mb": round(mean_uss, 1), "total_pss_mb": round(total_pss, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-worker memory with and without preload")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000, help="warm-up requests per run")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit("Needs Linux /proc/<pid>/smaps_rollup")
+
+    bodies = [encode(payload, 'json') for payload in load_payloads(os.path.join(BASE_DIR, 'students.csv'), False)]
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "workers": args.workers,
+        "per_worker_import": measure("No preload", args.workers, None, bodies, args.requests),
+        "preload": measure("gunicorn.conf.py", args.workers, os.path.join(BASE_DIR, 'gunicorn.conf.py'),
+                           bodies, args.requests),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmark for the /predict endpoint of every app.
+
+Drives main.py, api/index.py and backend_api.py either in-process through the
+Flask test client or over HTTP against a local gunicorn server, at several
+concurrency levels. Requests replay rows of students.csv (or one repeated
+payload with --repeat). For each run it reports p50/p95/p99 latency and
+requests per second, plus a per-stage breakdown (parse, validate, inference,
+render and the remaining framework overhead) taken from the Server-Timing
+header the apps send when SERVER_TIMING=1.
+
+Results are written as JSON; --compare checks them against an earlier run and
+exits non-zero when p99 latency or throughput regressed beyond --tolerance.
+
+Usage:
+    python benchmarks/bench_serving.py --output benchmarks/results/serving.json
+    python benchmarks/bench_serving.py --mode gunicorn --workers 2 --compare benchmarks/results/serving.json
+"""
+
+import argparse
+import csv
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'benchmarks', 'results', 'serving.json')
+
+# The apps only send Server-Timing when this is set at import time
+os.environ['SERVER_TIMING'] = '1'
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+# name -> (WSGI module, request body encoding)
+TARGETS = {
+    'main': ('main', 'form'),
+    'vercel': ('api.index', 'form'),
+    'backend': ('backend_api', 'json'),
+}
+FEATURES = ['study_hours', 'sleep_hours', 'absences', 'assignments_completed', 'exam_score']
+STAGES = ['parse', 'validate', 'inference', 'render']
+
+
+def load_payloads(csv_path, repeat):
+    """Feature dicts to replay: every students.csv row, or one fixed row."""
+    if repeat:
+        return [{'study_hours': 5, 'sleep_hours': 7, 'absences': 2, 'assignments_completed': 8, 'exam_score': 85}]
+    with open(csv_path, newline='') as f:
+        return [{name: int(row[name]) for name in FEATURES} for row in csv.DictReader(f)]
+
+
+def encode(payload, encoding):
+    """(body bytes, content type) for one request."""
+    if encoding == 'json':
+        return json.dumps(payload).encode(), 'application/json'
+    return urlencode(payload).encode(), 'application/x-www-form-urlencoded'
+
+
+def parse_server_timing(header):
+    """{'parse': seconds, ...} from a Server-Timing header value."""
+    stages = {}
+    for entry in header.split(','):
+        name, _, duration = entry.strip().partition(';dur=')
+        if duration:
+            stages[name] = float(duration) / 1000
+    return stages
+
+
+# ------------------ Clients ------------------ #
+
+class TestClientSender:
+    """Sends requests in-process; one Flask test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def __call__(self, body, content_type):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.post('/predict', data=body, content_type=content_type)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class HttpSender:
+    """Sends requests over HTTP; one connection per thread, reopened when closed."""
+
+    def __init__(self, port):
+        self.port = port
+        self.local = threading.local()
+
+    def __call__(self, body, content_type):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            conn.request('POST', '/predict', body=body, headers={'Content-Type': content_type})
+            response = conn.getresponse()
+            response.read()
+        except (ConnectionError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+        if response.getheader('Connection', '').lower() == 'close':
+            conn.close()
+            self.local.conn = None
+        return response.status, response.getheader('Server-Timing') or ''
+
+
+def start_gunicorn(module, workers, extra_args=(), env=None, config=None):
+    """Start gunicorn for module:app on a free local port; returns (process, port).
+
+    gunicorn reads ./gunicorn.conf.py by itself, so it is started from the
+    benchmarks directory and only gets a config file when one is passed.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *(['-c', config] if config else []), '--chdir', BASE_DIR,
+         '-b', f'127.0.0.1:{port}', '-w', str(workers), '--log-level', 'warning', *extra_args, f'{module}:app'],
+        cwd=os.path.join(BASE_DIR, 'benchmarks'), env=dict(os.environ, SERVER_TIMING='1', **(env or {})),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start listening within 30s")
+
+
+# ------------------ Measurement ------------------ #
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_level(send, bodies, requests, concurrency):
+    """Send `requests` requests from `concurrency` threads and summarise them."""
+    latencies = []
+    stage_totals = {}
+    timed = [0]
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(requests))
+    start_gate = threading.Barrier(concurrency + 1)
+
+    def worker():
+        own_latencies, own_stages, own_timed, own_statuses = [], {}, 0, {}
+        start_gate.wait()
+        for i in counter:
+            body, content_type = bodies[i % len(bodies)]
+            sent = time.perf_counter()
+            try:
+                status, timing = send(body, content_type)
+            except (OSError, http.client.HTTPException):
+                status, timing = 'error', ''
+            own_latencies.append(time.perf_counter() - sent)
+            own_statuses[status] = own_statuses.get(status, 0) + 1
+            if timing:
+                own_timed += 1
+                for name, seconds in parse_server_timing(timing).items():
+                    own_stages[name] = own_stages.get(name, 0.0) + seconds
+        with lock:
+            latencies.extend(own_latencies)
+            timed[0] += own_timed
+            for name, seconds in own_stages.items():
+                stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+            for status, count in own_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    mean_latency = sum(latencies) / len(latencies)
+    stages_ms = {}
+    if timed[0]:
+        # Only the stages this app records, in request order
+        stages_ms = {name: round(stage_totals[name] / timed[0] * 1000, 4) for name in STAGES if name in stage_totals}
+        # Whatever the handler did not account for: WSGI, routing, client, network
+        stages_ms['overhead'] = round(mean_latency * 1000 - sum(stages_ms.values()), 4)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(mean_latency * 1000, 4),
+            "p50": round(percentile(latencies, 50) * 1000, 4),
+            "p95": round(percentile(latencies, 95) * 1000, 4),
+            "p99": round(percentile(latencies, 99) * 1000, 4),
+            "max": round(latencies[-1] * 1000, 4),
+        },
+        "stages_mean_ms": stages_ms,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def bench_target(name, mode, payloads, levels, requests, warmup, workers):
+    """Run every concurrency level against one app; returns {concurrency: summary}."""
+    module, encoding = TARGETS[name]
+    bodies = [encode(payload, encoding) for payload in payloads]
+    process = None
+    if mode == 'testclient':
+        import importlib
+        send = TestClientSender(importlib.import_module(module).app)
+    else:
+        process, port = start_gunicorn(module, workers)
+        send = HttpSender(port)
+    try:
+        # Warm-up loads lazily-loaded models and fills per-thread connections
+        run_level(send, bodies, warmup, 1)
+        results = {}
+        for concurrency in levels:
+            summary = run_level(send, bodies, requests, concurrency)
+            results[str(concurrency)] = summary
+            latency = summary['latency_ms']
+            print(f"  {name:8s} {mode:10s} c={concurrency:<3d} {summary['req_per_sec']:>9,.1f} req/s  "
+                  f"p50 {latency['p50']:.3f}  p95 {latency['p95']:.3f}  p99 {latency['p99']:.3f} ms  "
+                  f"stages {summary['stages_mean_ms']}")
+        return results
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+# ------------------ Regression check ------------------ #
+
+def compare(baseline, current, tolerance):
+    """List regressions of p99 latency or throughput beyond tolerance (a fraction)."""
+    regressions = []
+    for key, modes in current['results'].items():
+        for mode, levels in modes.items():
+            for concurrency, summary in levels.items():
+                before = baseline.get('results', {}).get(key, {}).get(mode, {}).get(concurrency)
+                if before is None:
+                    continue
+                where = f"{key}/{mode}/c={concurrency}"
+                old_p99, new_p99 = before['latency_ms']['p99'], summary['latency_ms']['p99']
+                if new_p99 > old_p99 * (1 + tolerance):
+                    regressions.append(f"{where}: p99 {old_p99:.3f} -> {new_p99:.3f} ms")
+                old_rps, new_rps = before['req_per_sec'], summary['req_per_sec']
+                if new_rps < old_rps * (1 - tolerance):
+                    regressions.append(f"{where}: throughput {old_rps:,.1f} -> {new_rps:,.1f} req/s")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /predict latency and throughput")
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument('--mode', nargs='+', choices=['testclient', 'gunicorn'], default=['testclient'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'students.csv'), help="payloads to replay")
+    parser.add_argument('--repeat', action='store_true', help="send one identical payload (cache-friendly)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--compare', help="earlier results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    payloads = load_payloads(args.csv, args.repeat)
+    results = {}
+    for name in args.targets:
+        for mode in args.mode:
+            results.setdefault(name, {})[mode] = bench_target(
+                name, mode, payloads, args.concurrency, args.requests, args.warmup, args.workers)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "requests": args.requests, "warmup": args.warmup, "workers": args.workers,
+            "payloads": len(payloads),
+        },
+        "results": results,
+    }
+
+    regressions = compare(baseline, report, args.tolerance) if baseline else []
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        if regressions:
+            print(f"Regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
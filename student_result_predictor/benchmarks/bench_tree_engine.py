@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Equivalence check and microbenchmark for the compiled tree engine.
+
+Verifies that CompiledTree gives the same label and probability as sklearn
+for every row of students.csv, then compares the per-call latency of a single
+prediction: sklearn predict + predict_proba on a 1x5 array versus one
+CompiledTree.predict_one walk.
+
+Usage: python benchmarks/bench_tree_engine.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import warnings
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from tree_engine import CompiledTree
+
+FEATURE_COLS = ['study_hours', 'sleep_hours', 'absences', 'assignments_completed', 'exam_score']
+
+
+def check_equivalence(model, engine, rows):
+    """Compare engine and sklearn outputs on every row, return mismatch count."""
+    prob = model.predict_proba(rows)
+    pred = model.predict(rows)
+    mismatches = 0
+    for i, row in enumerate(rows.tolist()):
+        label, probability = engine.predict_one(row)
+        expected = float(prob[i][list(model.classes_).index(pred[i])])
+        if label != pred[i] or abs(probability - expected) > 1e-12:
+            mismatches += 1
+            print(f"Row {i}: engine=({label}, {probability}) sklearn=({pred[i]}, {expected})")
+    return mismatches
+
+
+def per_call_us(func, repeat):
+    """Best-of-5 mean latency of func() in microseconds."""
+    return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=2000, help="calls per timing run")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    model = joblib.load(os.path.join(BASE_DIR, 'model', 'dt_model.joblib'))
+    engine = CompiledTree.from_estimator(model)
+
+    df = pd.read_csv(os.path.join(BASE_DIR, 'students.csv'))
+    rows = df[FEATURE_COLS].to_numpy(dtype=np.float64)
+
+    mismatches = check_equivalence(model, engine, rows)
+    print(f"Equivalence: {len(rows) - mismatches}/{len(rows)} rows match sklearn")
+
+    sample = [5, 7, 2, 8, 85]
+
+    def sklearn_call():
+        features = np.array([sample])
+        model.predict(features)
+        model.predict_proba(features)
+
+    def engine_call():
+        engine.predict_one(sample)
+
+    sklearn_us = per_call_us(sklearn_call, max(1, args.repeat // 10))
+    engine_us = per_call_us(engine_call, args.repeat)
+    print(f"sklearn predict + predict_proba: {sklearn_us:9.2f} us/call")
+    print(f"CompiledTree.predict_one:        {engine_us:9.2f} us/call")
+    print(f"Speedup: {sklearn_us / engine_us:.0f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
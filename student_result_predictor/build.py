@@ -2,74 +2,392 @@
 """
 Build script for Vercel deployment
 Ensures the model is properly trained and ready for deployment
+
+The build is incremental. Every artifact is a step whose inputs (dataset
+content, training code, hyperparameters, library version, upstream artifacts)
+are hashed into a key; model/build_manifest.json records the key and the
+output hashes of the last successful run, and a step whose key and outputs
+still match is skipped. Independent steps run in parallel, and the no-op
+path never imports sklearn, so a warm build takes a fraction of a second.
+
+    python build.py                   # retrain stale models, publish classifier + regressor
+    python build.py --plot            # also render the PNGs
+    python build.py --answer-table    # also precompute the answer table
+    python build.py --no-assets       # skip hashing and compressing static/ (see assets.py)
+    python build.py --force           # ignore the manifest
+    python build.py --source model/dt_model.joblib   # publish an existing classifier
 """
 
+import argparse
+import hashlib
+import json
 import os
 import sys
-import subprocess
-
-def ensure_model_exists():
-    """Ensure the ML model exists, create it if it doesn't"""
-    model_path = os.path.join('model', 'dt_model.joblib')
-    
-    if not os.path.exists(model_path):
-        print("Model not found. Training model...")
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+
+from model_registry import file_digest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = 'build_manifest.json'
+
+_print_lock = threading.Lock()
+
+# Sources whose changes make trained models stale (PARAM_GRID lives in train_model.py)
+TRAINING_CODE = ['train_model.py', 'dataset_cache.py', 'features.py']
+
+
+def say(message):
+    """print() for steps running in parallel: one whole line at a time."""
+    with _print_lock:
+        print(message, flush=True)
+
+
+def repo_path(path):
+    """Path relative to this directory, so the manifest means the same on every checkout."""
+    return os.path.relpath(os.path.abspath(path), BASE_DIR)
+
+
+class BuildManifest:
+    """Input keys and output hashes of the last successful run of each step."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
         try:
-            # Run the training script
-            subprocess.run([sys.executable, 'train_model.py'], check=True)
-            print("Model trained successfully!")
-        except subprocess.CalledProcessError as e:
-            print(f"Error training model: {e}")
+            with open(path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        self.data.setdefault('files', {})
+        self.data.setdefault('steps', {})
+
+    def digest(self, path):
+        """SHA-256 of a file, reusing the recorded one while size and mtime are unchanged."""
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        key = repo_path(path)
+        with self._lock:
+            entry = self.data['files'].get(key)
+        if entry is not None and entry['stamp'] == stamp:
+            return entry['sha256']
+        digest = file_digest(path)
+        with self._lock:
+            self.data['files'][key] = {"stamp": stamp, "sha256": digest}
+        return digest
+
+    def fresh(self, name, key, outputs):
+        entry = self.data['steps'].get(name)
+        if entry is None or entry['key'] != key:
             return False
-        except FileNotFoundError:
-            print("train_model.py not found. Creating minimal model...")
-            create_minimal_model()
-    else:
-        print("Model already exists.")
-    
-    return True
-
-def create_minimal_model():
-    """Create a minimal model if training script is not available"""
-    from sklearn.tree import DecisionTreeClassifier
-    from sklearn.model_selection import train_test_split
-    import pandas as pd
+        for path in outputs:
+            if not os.path.exists(path) or self.digest(path) != entry['outputs'].get(repo_path(path)):
+                return False
+        return True
+
+    def info(self, name):
+        return self.data['steps'].get(name, {}).get('info')
+
+    def record(self, name, key, outputs, info=None):
+        hashes = {repo_path(path): self.digest(path) for path in outputs}
+        with self._lock:
+            self.data['steps'][name] = {"key": key, "outputs": hashes, "info": info}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class Step:
+    """One artifact: run() rebuilds outputs whenever the hash of inputs() changes.
+
+    inputs() is called once the dependencies have finished, so it may hash
+    their outputs. A step without inputs always runs (it checks freshness itself).
+    """
+
+    def __init__(self, name, run, outputs=(), inputs=None, deps=()):
+        self.name = name
+        self.run = run
+        self.outputs = list(outputs)
+        self.inputs = inputs
+        self.deps = list(deps)
+
+    def build(self, manifest, force=False):
+        if self.inputs is None:
+            self.run()
+            return
+        key = hashlib.sha256(json.dumps(self.inputs(), sort_keys=True).encode()).hexdigest()
+        if not force and manifest.fresh(self.name, key, self.outputs):
+            say(f"{self.name}: up to date")
+            return
+        start = time.perf_counter()
+        info = self.run()
+        manifest.record(self.name, key, self.outputs, info)
+        say(f"{self.name}: built in {time.perf_counter() - start:.2f}s")
+
+
+def run_steps(steps, manifest, force=False):
+    """Run steps, each as soon as its dependencies finish."""
+    futures = {}
+    # Submit in dependency order, so every dependency has a future by the time it is awaited
+    ordered = []
+    while len(ordered) < len(steps):
+        names = {step.name for step in ordered}
+        ready = [step for step in steps if step not in ordered and names.issuperset(step.deps)]
+        if not ready:
+            raise ValueError("Build steps have missing or circular dependencies")
+        ordered += ready
+
+    def run(step):
+        for dep in step.deps:
+            futures[dep].result()
+        step.build(manifest, force)
+
+    # One thread per step, so a step waiting on its dependencies never starves them
+    with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+        for step in ordered:
+            futures[step.name] = pool.submit(run, step)
+    for future in futures.values():
+        future.result()
+
+
+# ------------------ Steps ------------------ #
+
+def training_steps(manifest, csv_path, out_dir, cv, n_jobs, plot):
+    """Classifier, regressor, their metrics report and (optionally) plots."""
+    classifier_path = os.path.join(out_dir, 'dt_classifier.joblib')
+    regressor_path = os.path.join(out_dir, 'dt_regressor.joblib')
+    dataset_lock = threading.Lock()
+    dataset = {}
+    # pyplot keeps global state, so figures are drawn one at a time
+    plot_lock = threading.Lock()
+
+    def load():
+        # Only stale steps need the data, and they share one load
+        with dataset_lock:
+            if not dataset:
+                from train_model import load_dataset
+                start = time.perf_counter()
+                dataset['X'], dataset['y_class'], dataset['y_reg'] = load_dataset(csv_path)
+                dataset['seconds'] = round(time.perf_counter() - start, 4)
+        return dataset['X'], dataset['y_class'], dataset['y_reg']
+
+    def timed(func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, round(time.perf_counter() - start, 4)
+
+    def training_inputs():
+        return {
+            "dataset": manifest.digest(csv_path),
+            "code": {name: manifest.digest(os.path.join(BASE_DIR, name)) for name in TRAINING_CODE},
+            "cv": cv,
+            "sklearn": metadata.version('scikit-learn'),
+        }
+
+    def classifier():
+        from train_model import save_classifier, train_classifier
+
+        X, y_class, _ = load()
+        (clf, metrics), fit_seconds = timed(train_classifier, X, y_class, cv, n_jobs)
+        metrics.pop('report')
+        _, save_seconds = timed(save_classifier, clf, metrics, out_dir)
+        say(f"classifier: accuracy {metrics['accuracy']}%, {metrics['best_params']}")
+        return {"metrics": metrics, "rows": len(X),
+                "stages_seconds": {"load": dataset['seconds'], "fit_classifier": fit_seconds,
+                                   "save_classifier": save_seconds}}
+
+    def regressor():
+        from train_model import save_regressor, train_regressor
+
+        X, _, y_reg = load()
+        (reg, metrics, _, _), fit_seconds = timed(train_regressor, X, y_reg, cv, n_jobs)
+        _, save_seconds = timed(save_regressor, reg, metrics, out_dir)
+        say(f"regressor: R² {metrics['r2']:.2f}, {metrics['best_params']}")
+        return {"metrics": metrics, "rows": len(X),
+                "stages_seconds": {"load": dataset['seconds'], "fit_regressor": fit_seconds,
+                                   "save_regressor": save_seconds}}
+
+    def published_version():
+        from model_registry import ModelRegistry
+
+        return ModelRegistry().find_source(classifier_path, regressor_path)
+
+    def report_inputs():
+        return {"classifier": manifest.info('classifier'), "regressor": manifest.info('regressor'),
+                "published_version": published_version()}
+
+    def metrics_report():
+        # Same shape as train_model.run_pipeline's report; each model's timings
+        # come from the build that last trained it
+        classifier_info = manifest.info('classifier')
+        regressor_info = manifest.info('regressor')
+        stages = {**regressor_info['stages_seconds'], **classifier_info['stages_seconds']}
+        report = {
+            "dataset": {"path": repo_path(csv_path), "rows": classifier_info['rows'],
+                        "sha256": manifest.digest(csv_path)},
+            "classifier": classifier_info['metrics'],
+            "regressor": regressor_info['metrics'],
+            "published_version": published_version(),
+            "stages_seconds": stages,
+            "total_seconds": round(sum(stages.values()), 4),
+        }
+        with open(os.path.join(out_dir, 'training_report.json'), 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def classifier_plot():
+        import joblib
+        from train_model import plot_classifier
+
+        clf = joblib.load(classifier_path)
+        with plot_lock:
+            plot_classifier(clf, out_dir)
+
+    def regressor_plots():
+        import joblib
+        from train_model import plot_regressor, regression_holdout
+
+        X, _, y_reg = load()
+        reg = joblib.load(regressor_path)
+        y_test, y_pred = regression_holdout(reg, X, y_reg)
+        with plot_lock:
+            plot_regressor(reg, y_test, y_pred, out_dir)
+
+    def plot_code():
+        return manifest.digest(os.path.join(BASE_DIR, 'train_model.py'))
+
+    steps = [
+        Step('classifier', classifier, [classifier_path, os.path.join(out_dir, 'accuracy.txt')],
+             training_inputs),
+        Step('regressor', regressor, [regressor_path, os.path.join(out_dir, 'regression_r2.txt')],
+             training_inputs),
+        Step('metrics', metrics_report, [os.path.join(out_dir, 'training_report.json')], report_inputs,
+             deps=['classifier', 'regressor', 'publish']),
+    ]
+    if plot:
+        steps += [
+            Step('classifier_plot', classifier_plot, [os.path.join(out_dir, 'decision_tree_classifier.png')],
+                 lambda: {"classifier": manifest.digest(classifier_path), "code": plot_code()},
+                 deps=['classifier']),
+            Step('regressor_plots', regressor_plots,
+                 [os.path.join(out_dir, name) for name in
+                  ('decision_tree_regressor.png', 'actual_vs_predicted_regression.png')],
+                 lambda: {"regressor": manifest.digest(regressor_path), "dataset": manifest.digest(csv_path),
+                          "code": plot_code()},
+                 deps=['regressor']),
+        ]
+    return steps
+
+
+def publish_model(source_path, regressor_path=None, csv_path=os.path.join(BASE_DIR, 'students.csv')):
+    """Publish the trained model (and grade regressor) to the registry unless it is already active"""
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry()
+    version = registry.find_source(source_path, regressor_path)
+    if version is not None and version == registry.current_version():
+        say(f"Model already published as {version}.")
+        return
+
+    if version is not None:
+        registry.activate(version)
+        say(f"Re-activated {version}.")
+        return
+
     import joblib
-    import numpy as np
-    
-    # Create synthetic data for demo
-    np.random.seed(42)
-    n_samples = 1000
-    
-    data = {
-        'study_hours': np.random.randint(0, 9, n_samples),
-        'sleep_hours': np.random.randint(4, 10, n_samples),
-        'absences': np.random.randint(0, 21, n_samples),
-        'assignments_completed': np.random.randint(0, 21, n_samples),
-        'exam_score': np.random.randint(40, 101, n_samples)
-    }
-    
-    # Simple logic to create target variable
-    df = pd.DataFrame(data)
-    df['result'] = ((df['study_hours'] >= 5) & 
-                   (df['sleep_hours'] >= 6) & 
-                   (df['absences'] <= 10) & 
-                   (df['assignments_completed'] >= 10) & 
-                   (df['exam_score'] >= 60)).astype(int)
-    
-    # Prepare features and target
-    X = df[['study_hours', 'sleep_hours', 'absences', 'assignments_completed', 'exam_score']]
-    y = df['result']
-    
-    # Train model
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = DecisionTreeClassifier(random_state=42)
-    model.fit(X_train, y_train)
-    
-    # Save model
-    os.makedirs('model', exist_ok=True)
-    joblib.dump(model, 'model/dt_model.joblib')
-    print("Minimal model created and saved!")
+    from tree_engine import CompiledRegressor, compile_classifier
+
+    engine = compile_classifier(joblib.load(source_path))
+    regressor = r2 = None
+    if regressor_path:
+        from train_model import holdout_r2, load_dataset
+
+        estimator = joblib.load(regressor_path)
+        regressor = CompiledRegressor.from_estimator(estimator)
+        X, _, y_reg = load_dataset(csv_path)
+        r2 = holdout_r2(estimator, X, y_reg)
+    version = registry.publish(engine, source_path, regressor=regressor, regressor_source=regressor_path,
+                               regressor_r2=r2)
+    say(f"Published {source_path} as {version} ({engine.node_count} nodes"
+        f"{f', regressor {regressor.node_count} nodes, R² {r2}' if regressor is not None else ''}).")
+
+def assets_step(manifest):
+    """Hashed, precompressed static files and pre-rendered pages (see assets.py)"""
+    import assets
+
+    def sources():
+        static_dir = os.path.join(BASE_DIR, 'static')
+        files = [os.path.join(static_dir, name) for name in sorted(os.listdir(static_dir))
+                 if os.path.isfile(os.path.join(static_dir, name))]
+        files += [os.path.join(BASE_DIR, 'templates', name) for name in assets.PAGES]
+        files += [os.path.join(BASE_DIR, name) for name in ('assets.py', os.path.join('api', 'index.py'))]
+        return {
+            "files": {os.path.relpath(path, BASE_DIR): manifest.digest(path) for path in files},
+            "brotli": assets.brotli_module() is not None,
+        }
+
+    def run():
+        from api.index import app
+
+        built = assets.build(app)
+        say(f"assets: {', '.join(entry['file'] for entry in built['assets'].values())}, "
+            f"{', '.join(entry['file'] for entry in built['pages'].values())}")
+
+    return Step('assets', run, [os.path.join(assets.ASSET_DIR, assets.MANIFEST_FILE)], sources)
+
+def build_answer_table():
+    """Precompute the active model's answer for every valid integer input, unless already current"""
+    from answer_table import AnswerTable, build_answer_table as build_table
+    from model_registry import ModelRegistry
+
+    from tree_engine import CompiledTree
+
+    loaded = ModelRegistry().load()
+    if not isinstance(loaded.engine, CompiledTree):
+        say(f"{loaded.version} is an ensemble; answer tables are built for single trees only.")
+        return
+    if AnswerTable.load(loaded.path, loaded.manifest_path) is not None:
+        say(f"Answer table for {loaded.version} is up to date.")
+        return
+    cells = build_table(loaded.engine, loaded.manifest_path, loaded.path, loaded.regressor)
+    say(f"Answer table built for {loaded.version} with {cells} cells.")
 
 if __name__ == "__main__":
-    ensure_model_exists()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Prepare the model for deployment")
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'students.csv'), help="training data")
+    parser.add_argument('--out-dir', default='model', help="where models, plots and the manifest are written")
+    parser.add_argument('--source', help="publish this trained classifier instead of training one")
+    parser.add_argument('--regressor', help="with --source: grade regressor to publish alongside it")
+    parser.add_argument('--plot', action='store_true', help="also render tree and regression plots (PNG)")
+    parser.add_argument('--answer-table', action='store_true',
+                        help="also precompute an answer table for the active model version")
+    parser.add_argument('--no-assets', action='store_true', help="skip building static/assets")
+    parser.add_argument('--cv', type=int, default=5, help="cross-validation folds")
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel search jobs (-1 = all cores)")
+    parser.add_argument('--force', action='store_true', help="rebuild every step regardless of the manifest")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    os.makedirs(args.out_dir, exist_ok=True)
+    manifest = BuildManifest(os.path.join(args.out_dir, MANIFEST_FILE))
+
+    steps = []
+    source, regressor = args.source, args.regressor
+    if source is None:
+        steps += training_steps(manifest, args.csv, args.out_dir, args.cv, args.jobs, args.plot)
+        source = os.path.join(args.out_dir, 'dt_classifier.joblib')
+        regressor = os.path.join(args.out_dir, 'dt_regressor.joblib')
+    for path in (source, regressor):
+        if args.source is not None and path is not None and not os.path.exists(path):
+            sys.exit(f"Model not found: {path}")
+    steps.append(Step('publish', lambda: publish_model(source, regressor, args.csv),
+                      deps=['classifier', 'regressor'] if args.source is None else []))
+    if not args.no_assets:
+        steps.append(assets_step(manifest))
+    if args.answer_table:
+        steps.append(Step('answer_table', build_answer_table, deps=['publish']))
+
+    run_steps(steps, manifest, args.force)
+    print(f"Build finished in {time.perf_counter() - started:.2f}s")
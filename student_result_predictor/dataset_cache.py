@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Columnar binary cache of students.csv-shaped training data.
+
+The first time a CSV is used it is parsed once, in chunks, into one .npy file
+per column: each feature in the narrowest integer dtype that holds it (uint8
+for every range the apps accept) and the label as bool. The cache directory
+is named after the SHA-256 of the CSV's content, so an edited file gets a new
+cache and an unchanged one is never parsed again; later runs memory-map the
+columns, which costs a few pages instead of a full parse.
+
+Usage:
+    python dataset_cache.py students.csv        # build (or reuse) the cache
+    python dataset_cache.py big.csv --rebuild
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_NAMES
+from model_registry import file_digest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'cache')
+
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.json'
+LABEL = 'passed'
+FORMAT = 'columns/1'
+
+CHUNK_ROWS = 1_000_000
+# Candidate dtypes for integer features, narrowest first
+INTEGER_DTYPES = [np.uint8, np.int8, np.uint16, np.int16, np.int32, np.int64]
+
+
+def narrowest_dtype(values):
+    """Smallest dtype that holds every value exactly (float32 for non-integers)."""
+    if len(values) == 0:
+        return np.dtype(np.uint8)
+    if not np.array_equal(values, np.round(values)):
+        return np.dtype(np.float32)
+    low, high = values.min(), values.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+def _content_digest(csv_path, cache_dir):
+    """SHA-256 of the CSV, reusing the last digest while size and mtime are unchanged."""
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    stat = os.stat(csv_path)
+    path = os.path.abspath(csv_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    entry = index.get(path)
+    if entry is not None and entry['stamp'] == stamp:
+        return entry['sha256']
+
+    digest = file_digest(csv_path)
+    index[path] = {"stamp": stamp, "sha256": digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+    return digest
+
+
+def build_cache(csv_path, out_dir, chunk_rows=CHUNK_ROWS):
+    """Parse the CSV in chunks into narrow .npy columns under out_dir; returns the meta dict."""
+    chunks = {name: [] for name in FEATURE_NAMES + [LABEL]}
+    rows = dropped = 0
+    for frame in pd.read_csv(csv_path, usecols=FEATURE_NAMES + ['result'], chunksize=chunk_rows):
+        # Integer columns pass through; anything else is coerced and unparsable values become NaN
+        features = frame[FEATURE_NAMES].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        label = frame['result'].map({'Fail': False, 'Pass': True})
+        # Same rows train_model.py always dropped: unparsable values or labels
+        keep = ~np.isnan(features).any(axis=1) & label.notna().to_numpy()
+        for col, name in enumerate(FEATURE_NAMES):
+            column = features[keep, col]
+            chunks[name].append(column.astype(narrowest_dtype(column)))
+        chunks[LABEL].append(label.to_numpy()[keep].astype(bool))
+        rows += int(keep.sum())
+        dropped += int((~keep).sum())
+
+    staging = f"{out_dir}.staging-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    columns = {}
+    for name, parts in chunks.items():
+        dtype = np.result_type(*parts) if parts else np.dtype(bool if name == LABEL else np.uint8)
+        column = np.concatenate(parts).astype(dtype, copy=False) if parts else np.empty(0, dtype)
+        chunks[name] = None  # free the parts as soon as each column is written
+        np.save(os.path.join(staging, f"{name}.npy"), column)
+        columns[name] = column.dtype.str
+
+    meta = {
+        "format": FORMAT,
+        "source": os.path.abspath(csv_path),
+        "rows": rows,
+        "dropped_rows": dropped,
+        "columns": columns,
+    }
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.rename(staging, out_dir)
+    return meta
+
+
+def load_columns(csv_path, cache_dir=DEFAULT_CACHE_DIR, rebuild=False):
+    """Memory-mapped {column: array} for a CSV, building its cache on first use.
+
+    Returns the feature columns by name plus the bool 'passed' label.
+    """
+    digest = _content_digest(csv_path, cache_dir)
+    out_dir = os.path.join(cache_dir, digest)
+    meta_path = os.path.join(out_dir, META_FILE)
+    if rebuild or not os.path.exists(meta_path):
+        start = time.perf_counter()
+        meta = build_cache(csv_path, out_dir)
+        print(f"Cached {meta['rows']:,} rows of {csv_path} in {time.perf_counter() - start:.2f}s -> {out_dir}")
+    return {
+        name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode='r')
+        for name in FEATURE_NAMES + [LABEL]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar cache for a training CSV")
+    parser.add_argument('csv', help="students.csv-shaped file")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--rebuild', action='store_true', help="re-parse even if a cache exists")
+    args = parser.parse_args()
+
+    columns = load_columns(args.csv, args.cache_dir, args.rebuild)
+    for name, column in columns.items():
+        print(f"  {name:22s} {column.dtype}  {column.nbytes:,} bytes")
+
+
+if __name__ == '__main__':
+    main()
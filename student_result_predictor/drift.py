@@ -0,0 +1,268 @@
+"""
+Streaming input-distribution and drift statistics for the serving apps.
+
+Every validated prediction adds one count per feature to a fixed histogram
+over that feature's integer range (FEATURE_RANGES, 118 bins in all) and one
+to the prediction and pass counters, so memory never grows with traffic.
+Each thread updates its own shard of counters without taking a lock; the
+shards are only summed when a report is asked for, and a finished thread's
+shard is folded into a retired total so short-lived threads do not pile up.
+With METRICS_DIR set, /drift also merges the snapshots of the other gunicorn
+workers (see snapshots.py).
+
+Drift is the Population Stability Index of each feature's live histogram
+against the same histogram of the training CSV (under 0.1 is usually read as
+stable, above 0.25 as a significant shift).
+"""
+
+import csv
+import math
+import os
+import threading
+
+from features import FEATURE_RANGES
+from snapshots import METRICS_DIR, Snapshots
+
+# How often each process rewrites its snapshot
+FLUSH_SECONDS = float(os.environ.get('DRIFT_FLUSH_SECONDS', 1))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Training data the live inputs are compared with
+REFERENCE_CSV = os.environ.get('DRIFT_REFERENCE_CSV', os.path.join(BASE_DIR, 'students.csv'))
+
+# Start of each feature's bins in the flat counts list, and the total bin count
+OFFSETS = []
+BINS = 0
+for _, _low, _high, _ in FEATURE_RANGES:
+    OFFSETS.append(BINS)
+    BINS += _high - _low + 1
+
+# Keeps empty bins from making the PSI infinite
+EPSILON = 1e-4
+# PSI levels reported as moderate and significant drift
+MODERATE_PSI = 0.1
+SIGNIFICANT_PSI = 0.25
+
+
+class _Shard:
+    """Counters written by one thread only."""
+
+    __slots__ = ('counts', 'predictions', 'passes')
+
+    def __init__(self):
+        self.counts = [0] * BINS
+        self.predictions = 0
+        self.passes = 0
+
+    def fold(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.predictions += other.predictions
+        self.passes += other.passes
+
+
+def histogram_counts(rows):
+    """Flat per-feature histogram, prediction count and pass count of (features, passed) rows.
+
+    Values outside a feature's range are skipped, as is any row with a non-number.
+    """
+    counts = [0] * BINS
+    predictions = passes = 0
+    for features, passed in rows:
+        bins = _bins(features)
+        if bins is None:
+            continue
+        for index in bins:
+            counts[index] += 1
+        predictions += 1
+        passes += bool(passed)
+    return counts, predictions, passes
+
+
+def _bins(features):
+    bins = []
+    for value, offset, (_, low, high, _) in zip(features, OFFSETS, FEATURE_RANGES):
+        if not (low <= value <= high):  # also rejects NaN
+            return None
+        bins.append(offset + int(value) - low)
+    return bins
+
+
+class DriftMonitor:
+    """Fixed-size input histograms and pass rate of one process, mergeable across workers."""
+
+    def __init__(self, directory=METRICS_DIR, reference_csv=REFERENCE_CSV):
+        self.directory = directory
+        self.reference_csv = reference_csv
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) of every thread that has recorded
+        self._retired = _Shard()  # counts of threads that have finished
+        self._lock = threading.Lock()  # guards the shard list, not the counters
+        self._pid = None
+        self._written = None
+        self._reference = None
+        self.snapshots = Snapshots(directory, 'drift', self._collect, FLUSH_SECONDS)
+
+    def _shard(self):
+        if self._pid != os.getpid():
+            self._start()
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._retire_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_finished(self):
+        # A finished thread never writes its shard again, so folding it is safe
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._retired.fold(shard)
+        self._shards = live
+
+    def record(self, features, passed):
+        """Count one row and whether it was predicted to pass (rows out of range are skipped)."""
+        bins = _bins(features)
+        if bins is None:
+            return
+        shard = self._shard()
+        counts = shard.counts
+        for index in bins:
+            counts[index] += 1
+        shard.predictions += 1
+        shard.passes += bool(passed)
+
+    def add(self, counts, predictions, passes):
+        """Add pre-aggregated counts (see histogram_counts), e.g. for a whole batch."""
+        shard = self._shard()
+        for index, count in enumerate(counts):
+            if count:
+                shard.counts[index] += count
+        shard.predictions += predictions
+        shard.passes += passes
+
+    def totals(self):
+        """(counts, predictions, passes) summed over this process's shards."""
+        total = _Shard()
+        with self._lock:
+            self._retire_finished()
+            total.fold(self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            total.fold(shard)
+        return total.counts, total.predictions, total.passes
+
+    # ------------------ Multi-process snapshots ------------------ #
+
+    def _start(self):
+        # Runs once per process: a forked child starts from empty shards
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._shards = []
+            self._retired = _Shard()
+            self._written = None
+            self.snapshots.start()
+
+    def _collect(self):
+        totals = self.totals()
+        if totals == self._written:
+            return None
+        self._written = totals
+        counts, predictions, passes = totals
+        return {"counts": counts, "predictions": predictions, "passes": passes}
+
+    def flush(self):
+        """Write this process's snapshot now."""
+        self.snapshots.flush()
+
+    def merged(self):
+        """This process's live totals plus the snapshots of every other process."""
+        counts, predictions, passes = self.totals()
+        for snapshot in self.snapshots.others():
+            if len(snapshot['counts']) != BINS:
+                continue
+            for index, count in enumerate(snapshot['counts']):
+                counts[index] += count
+            predictions += snapshot['predictions']
+            passes += snapshot['passes']
+        return counts, predictions, passes
+
+    # ------------------ Report ------------------ #
+
+    def reference(self):
+        """(counts, rows, passes) of the training CSV, read once; None if it is unavailable."""
+        if self._reference is None:
+            try:
+                with open(self.reference_csv, newline='') as f:
+                    rows = []
+                    for row in csv.DictReader(f):
+                        try:
+                            features = [float(row[name]) for name, _, _, _ in FEATURE_RANGES]
+                        except (KeyError, TypeError, ValueError):
+                            continue
+                        rows.append((features, row.get('result') == 'Pass'))
+            except OSError as e:
+                print(f"Drift reference unavailable: {e}")
+                return None
+            self._reference = histogram_counts(rows)
+        return self._reference
+
+    def report(self):
+        """Live histograms, pass rate and per-feature PSI against the training data."""
+        counts, predictions, passes = self.merged()
+        reference = self.reference()
+        features = {}
+        scores = []
+        for (name, low, high, _), offset in zip(FEATURE_RANGES, OFFSETS):
+            live = counts[offset:offset + high - low + 1]
+            entry = {"low": low, "high": high, "counts": live, "psi": None}
+            if reference is not None and predictions:
+                expected = reference[0][offset:offset + high - low + 1]
+                entry["training_counts"] = expected
+                entry["psi"] = round(psi(live, expected), 4)
+                scores.append(entry["psi"])
+            features[name] = entry
+
+        drift_score = max(scores) if scores else None
+        return {
+            "observed": predictions,
+            "pass_rate": round(passes / predictions, 4) if predictions else None,
+            "training_rows": reference[1] if reference is not None else None,
+            "training_pass_rate": round(reference[2] / reference[1], 4) if reference and reference[1] else None,
+            "drift_score": drift_score,
+            "drift": None if drift_score is None else (
+                'significant' if drift_score > SIGNIFICANT_PSI else
+                'moderate' if drift_score > MODERATE_PSI else 'stable'),
+            "features": features
+        }
+
+
+def psi(actual, expected):
+    """Population Stability Index between two histograms over the same bins."""
+    actual_total = sum(actual) or 1
+    expected_total = sum(expected) or 1
+    score = 0.0
+    for a, e in zip(actual, expected):
+        a = max(a / actual_total, EPSILON)
+        e = max(e / expected_total, EPSILON)
+        score += (a - e) * math.log(a / e)
+    return score
+
+
+DRIFT = DriftMonitor()
+
+
+def install(app, monitor=DRIFT):
+    """Serve the drift report of a Flask app on /drift."""
+    from flask import jsonify
+
+    @app.route('/drift')
+    def drift_endpoint():
+        return jsonify(monitor.report())
@@ -0,0 +1,47 @@
+"""
+Model input features shared by the apps, the build and offline tools.
+
+Kept free of module-level NumPy imports so the serverless app can import it
+without paying for NumPy on a cold start.
+"""
+
+# Feature order used by the model, with the valid range and error message for each
+FEATURE_RANGES = [
+    ('study_hours', 0, 8, "Study hours must be between 0 and 8"),
+    ('sleep_hours', 4, 9, "Sleep hours must be between 4 and 9"),
+    ('absences', 0, 20, "Absences must be between 0 and 20"),
+    ('assignments_completed', 0, 20, "Assignments must be between 0 and 20"),
+    ('exam_score', 40, 100, "Exam score must be between 40 and 100"),
+]
+FEATURE_NAMES = [name for name, _, _, _ in FEATURE_RANGES]
+
+# The grade regressor predicts the exam score, so it must not see it as an input
+GRADE_TARGET = 'exam_score'
+REGRESSOR_FEATURES = [name for name in FEATURE_NAMES if name != GRADE_TARGET]
+
+# Feature each validation message refers to, for counting failures per field
+MESSAGE_FIELDS = {message: name for name, _, _, message in FEATURE_RANGES}
+MESSAGE_FIELDS.update({f"Invalid input: {name} must be a number": name for name in FEATURE_NAMES})
+
+
+def validate_batch(features):
+    """Check every row at once, returning the valid-row mask and per-row errors."""
+    import numpy as np
+
+    not_numeric = np.isnan(features)
+    out_of_range = np.zeros_like(not_numeric)
+    for col, (_, low, high, _) in enumerate(FEATURE_RANGES):
+        column = features[:, col]
+        out_of_range[:, col] = ~not_numeric[:, col] & ((column < low) | (column > high))
+
+    valid = ~(not_numeric | out_of_range).any(axis=1)
+    errors = {}
+    for row in np.flatnonzero(~valid):
+        messages = []
+        for col, (name, _, _, message) in enumerate(FEATURE_RANGES):
+            if not_numeric[row, col]:
+                messages.append(f"Invalid input: {name} must be a number")
+            elif out_of_range[row, col]:
+                messages.append(message)
+        errors[int(row)] = messages
+    return valid, errors
@@ -1,45 +1,155 @@
-import pandas as pd
-import numpy as np
-import os
-
-# Set seed for reproducibility
-np.random.seed(42)
-
-# Number of students
-n = 1000
-
-# Generate data
-study_hours = np.random.randint(0, 9, n)   # 0-8 hours/day
-sleep_hours = np.random.randint(4, 10, n)  # 4-9 hours/day
-absences = np.random.randint(0, 21, n)     # 0-20 days absent
-assignments_completed = np.random.randint(0, 11, n)  # 0-10 assignments
-exam_score = np.random.randint(40, 101, n)  # 40 - 100
-
-# Performance logic (penalize more absences)
-performance_score = (
-    (study_hours * 5) +
-    (sleep_hours * 2) -
-    (absences * 2) +
-    (assignments_completed * 3) +
-    (exam_score * 0.6)
-)
-
-# Label pass/fail
-result = np.where(performance_score >= 100, "Pass", "Fail")
-
-# Build DataFrame
-df = pd.DataFrame({
-    "study_hours": study_hours,
-    "sleep_hours": sleep_hours,
-    "absences": absences,
-    "assignments_completed": assignments_completed,
-    "exam_score": exam_score,
-    "result": result
-})
-
-# Save to CSV
-os.makedirs("data", exist_ok=True)
-df.to_csv("data/students.csv", index=False)
-
-print("✅ Dataset generated with absences instead of attendance")
-print(df.head(10))
+#!/usr/bin/env python3
+"""
+Synthetic student dataset generator.
+
+Rows are produced in fixed-size chunks. Each chunk draws from its own random
+stream spawned from one SeedSequence, so for a given seed and chunk size the
+data is identical no matter how many workers generate it. Workers write their
+chunks in parallel as CSV, Parquet or .npy shards.
+
+Usage:
+    python generate_students.py --rows 1000 --output students.csv
+    python generate_students.py --rows 100000000 --format parquet --output data/students
+"""
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['study_hours', 'sleep_hours', 'absences', 'assignments_completed', 'exam_score', 'result']
+
+# Structured dtype of .npy shards; result is True for Pass
+NPY_DTYPE = np.dtype([
+    ('study_hours', 'u1'),
+    ('sleep_hours', 'u1'),
+    ('absences', 'u1'),
+    ('assignments_completed', 'u1'),
+    ('exam_score', 'u1'),
+    ('result', '?'),
+])
+
+
+def generate_chunk(seed, n):
+    """Generate n students from one spawned seed, returning a dict of columns."""
+    rng = np.random.default_rng(seed)
+
+    study_hours = rng.integers(0, 9, n, dtype=np.uint8)             # 0-8 hours/day
+    sleep_hours = rng.integers(4, 10, n, dtype=np.uint8)            # 4-9 hours/day
+    absences = rng.integers(0, 21, n, dtype=np.uint8)               # 0-20 days absent
+    assignments_completed = rng.integers(0, 11, n, dtype=np.uint8)  # 0-10 assignments
+    exam_score = rng.integers(40, 101, n, dtype=np.uint8)           # 40 - 100
+
+    # Performance logic (penalize more absences)
+    performance_score = (
+        (study_hours * 5.0) +
+        (sleep_hours * 2.0) -
+        (absences * 2.0) +
+        (assignments_completed * 3.0) +
+        (exam_score * 0.6)
+    )
+
+    return {
+        'study_hours': study_hours,
+        'sleep_hours': sleep_hours,
+        'absences': absences,
+        'assignments_completed': assignments_completed,
+        'exam_score': exam_score,
+        'passed': performance_score >= 100
+    }
+
+
+def write_shard(chunk, path, fmt):
+    """Write one chunk of columns as a CSV, Parquet or .npy shard."""
+    if fmt == 'npy':
+        shard = np.empty(len(chunk['passed']), dtype=NPY_DTYPE)
+        for name in COLUMNS[:-1]:
+            shard[name] = chunk[name]
+        shard['result'] = chunk['passed']
+        np.save(path, shard)
+        return
+
+    df = pd.DataFrame({name: chunk[name] for name in COLUMNS[:-1]})
+    df['result'] = np.where(chunk['passed'], "Pass", "Fail")
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _generate_shard(task):
+    """Worker entry point: generate and write one shard, return (rows, passes)."""
+    seed, n, path, fmt = task
+    chunk = generate_chunk(seed, n)
+    write_shard(chunk, path, fmt)
+    return n, int(chunk['passed'].sum())
+
+
+def generate(rows, chunk_rows, seed, fmt, shard_dir, workers):
+    """Generate `rows` students into shard files, returning (shard paths, passes)."""
+    n_chunks = -(-rows // chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    tasks = []
+    for i, child in enumerate(seeds):
+        n = min(chunk_rows, rows - i * chunk_rows)
+        tasks.append((child, n, os.path.join(shard_dir, f"part-{i:05d}.{fmt}"), fmt))
+
+    if workers == 1:
+        results = list(map(_generate_shard, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_generate_shard, tasks))
+    return [path for _, _, path, _ in tasks], sum(p for _, p in results)
+
+
+def merge_csv(shards, output):
+    """Concatenate CSV shards into one file, keeping only the first header."""
+    with open(output, 'wb') as out:
+        for i, shard in enumerate(shards):
+            with open(shard, 'rb') as f:
+                if i > 0:
+                    f.readline()
+                shutil.copyfileobj(f, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic students dataset")
+    parser.add_argument('--rows', type=int, default=1000, help="number of students")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000,
+                        help="rows per chunk/shard (the data depends on this, not on --workers)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['csv', 'parquet', 'npy'], default='csv')
+    parser.add_argument('--output', default=os.path.join('data', 'students'),
+                        help="shard directory, or a .csv file to merge CSV shards into")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    if args.rows < 1:
+        parser.error("--rows must be at least 1")
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows must be at least 1")
+
+    single_file = args.output.endswith('.csv')
+    if single_file and args.format != 'csv':
+        parser.error("a single output file is only supported for --format csv")
+    shard_dir = args.output + '.shards' if single_file else args.output
+
+    start = time.perf_counter()
+    shards, passes = generate(args.rows, args.chunk_rows, args.seed, args.format, shard_dir, args.workers)
+    if single_file:
+        merge_csv(shards, args.output)
+        shutil.rmtree(shard_dir)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Generated {args.rows:,} students in {len(shards)} chunk(s) -> {args.output}")
+    print(f"Pass rate: {passes / args.rows:.1%}")
+    print(f"{elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/sec)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Production gunicorn settings for backend_api.py (used by render.yaml).
+
+    gunicorn -c gunicorn.conf.py backend_api:app
+
+The app, and with it the memory-mapped model, is loaded once in the master
+and the workers are forked from it, so they share the interpreter heap and
+the model pages copy-on-write. gc.freeze() before forking moves everything
+loaded so far out of the collector's reach; otherwise the first collection
+in each worker would write to those objects and unshare their pages.
+
+Environment:
+    PORT                listen port (default 10000, set by Render)
+    WEB_CONCURRENCY     fixed worker count (default: sized from cores and memory)
+    WORKER_MEMORY_MB    memory to budget per worker when sizing (default 80)
+    GUNICORN_THREADS    threads per worker; above 1 uses gthread workers (default 1)
+    METRICS_DIR         where workers share /metrics and /drift snapshots (default: a fresh
+                        temp directory per server, removed when it exits)
+"""
+
+import gc
+import glob
+import os
+import shutil
+import tempfile
+
+# Memory to keep free for the master and the page cache
+RESERVED_MEMORY_MB = 128
+
+
+def available_memory_mb():
+    """Memory this container may use: the cgroup limit, else MemAvailable."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                limit = f.read().strip()
+        except OSError:
+            continue
+        if limit.isdigit() and int(limit) < 1 << 60:
+            return int(limit) // (1024 * 1024)
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def default_workers():
+    """2 * cores + 1, capped by how many workers fit in memory."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    workers = 2 * cores + 1
+    memory = available_memory_mb()
+    if memory is not None:
+        per_worker = int(os.environ.get('WORKER_MEMORY_MB', 80))
+        workers = min(workers, (memory - RESERVED_MEMORY_MB) // per_worker)
+    return max(1, workers)
+
+
+# Read by metrics.py and drift.py when the app is preloaded below, so set it first.
+# Each server gets its own directory, so servers on one host never see (or
+# delete) each other's snapshots; config reloads keep it via the environment
+_OWN_METRICS_DIR = None
+if not os.environ.get('METRICS_DIR'):
+    _OWN_METRICS_DIR = tempfile.mkdtemp(prefix='student-predictor-metrics-')
+    os.environ['METRICS_DIR'] = _OWN_METRICS_DIR
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or default_workers())
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+timeout = 30
+graceful_timeout = 30
+accesslog = '-'
+
+
+def on_starting(server):
+    # Counters restart with the server; drop snapshots of a previous run
+    for pattern in ('metrics-*.json', 'drift-*.json'):
+        for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], pattern)):
+            os.remove(path)
+
+
+def on_exit(server):
+    if _OWN_METRICS_DIR is not None:
+        shutil.rmtree(_OWN_METRICS_DIR, ignore_errors=True)
+
+
+def when_ready(server):
+    # The app is loaded by now (preload_app); freeze it before the first fork
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded app frozen, forking {server.num_workers} worker(s)")
+
+
+def pre_fork(server, worker):
+    # Also freeze anything the master allocated since, e.g. after a model swap
+    gc.freeze()
@@ -1,6 +1,9 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response
 import os
 
+from assets import REVALIDATE, Asset
+from timing import RequestTimer
+
 # Simple Flask app
 app = Flask(__name__)
 
@@ -8,9 +11,8 @@ app = Flask(__name__)
 app.template_folder = 'templates'
 app.static_folder = 'static'
 
-@app.route('/')
-def index():
-    return """
+# The form never changes, so it is encoded, compressed and hashed once at startup
+INDEX_PAGE = Asset("""
     <!DOCTYPE html>
     <html>
     <head><title>Student Result Predictor</title></head>
@@ -27,23 +29,30 @@ def index():
         <p><a href="/test">Test API</a></p>
     </body>
     </html>
-    """
+    """.encode(), 'text/html; charset=utf-8')
+
+@app.route('/')
+def index():
+    return INDEX_PAGE.response(REVALIDATE)
 
 @app.route('/predict', methods=['POST'])
 def predict():
+    timer = RequestTimer()
     try:
         study_hours = int(request.form.get('study_hours', 0))
         sleep_hours = int(request.form.get('sleep_hours', 0))
         absences = int(request.form.get('absences', 0))
         assignments_completed = int(request.form.get('assignments_completed', 0))
         exam_score = int(request.form.get('exam_score', 0))
+        timer.mark('parse')
         
         # Simple prediction logic
         score = (study_hours * 10) + (sleep_hours * 5) - (absences * 2) + (assignments_completed * 3) + (exam_score * 0.5)
         prediction = 'Pass' if score > 400 else 'Fail'
         probability = min(95, max(5, score / 6))
+        timer.mark('inference')
         
-        return f"""
+        page = f"""
         <!DOCTYPE html>
         <html>
         <head><title>Prediction Result</title></head>
@@ -61,6 +70,8 @@ def predict():
         </body>
         </html>
         """
+        timer.mark('render')
+        return timer.attach(make_response(page))
     except Exception as e:
         return f"Error: {str(e)}", 400
 
@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for the serving apps, in the text exposition format.
+
+Counters and fixed-bucket histograms live in plain dicts behind one lock, so
+recording a request costs a few microseconds. Each process serves its own
+numbers; with METRICS_DIR set, /metrics also sums the snapshots of the
+other gunicorn workers (see snapshots.py).
+"""
+
+import bisect
+import os
+import threading
+from time import perf_counter
+
+from snapshots import METRICS_DIR, Snapshots
+
+# How often each process rewrites its snapshot
+FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Histogram upper bounds in seconds
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+# name -> (type, help, histogram buckets)
+DEFINITIONS = {
+    'http_request_duration_seconds': (
+        'histogram', "Request latency by route, method and status code", REQUEST_BUCKETS),
+    'predict_stage_duration_seconds': (
+        'histogram', "Time spent in each stage of a prediction request", STAGE_BUCKETS),
+    'predictions_total': (
+        'counter', "Rows predicted, by source (model or heuristic fallback)", None),
+    'sweep_cells_total': (
+        'counter', "Grid cells scored by /predict/sweep, by source (not counted as predictions)", None),
+    'validation_failures_total': (
+        'counter', "Rejected input values, by feature", None),
+}
+
+
+class Metrics:
+    """Counters and histograms of one process, optionally merged with its siblings'."""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._values = {}  # (name, labels) -> number, or [bucket counts..., +Inf count, sum, count]
+        self._lock = threading.Lock()
+        self._changed = False
+        self._pid = None
+        self.snapshots = Snapshots(directory, 'metrics', self._collect, FLUSH_SECONDS)
+
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter."""
+        if self._pid != os.getpid() and self.directory:
+            self._start_flusher()
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._changed = True
+
+    def observe(self, name, seconds, **labels):
+        """Record one histogram observation."""
+        if self._pid != os.getpid() and self.directory:
+            self._start_flusher()
+        buckets = DEFINITIONS[name][2]
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(buckets) + 3)
+            values[bisect.bisect_left(buckets, seconds)] += 1
+            values[-2] += seconds
+            values[-1] += 1
+            self._changed = True
+
+    # ------------------ Multi-process snapshots ------------------ #
+
+    def _start_flusher(self):
+        # Runs once per process: threads and the file name do not survive fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked after recording: the parent keeps reporting its own numbers
+                self._values = {}
+            self._pid = os.getpid()
+            self.snapshots.start()
+
+    def _collect(self):
+        with self._lock:
+            if not self._changed:
+                return None
+            self._changed = False
+            return [[name, labels, list(values) if isinstance(values, list) else values]
+                    for (name, labels), values in self._values.items()]
+
+    def flush(self):
+        """Write this process's snapshot now."""
+        self.snapshots.flush()
+
+    def merged(self):
+        """This process's live values plus the snapshots of every other process."""
+        with self._lock:
+            totals = {key: list(values) if isinstance(values, list) else values
+                      for key, values in self._values.items()}
+        for entries in self.snapshots.others():
+            for name, labels, values in entries:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if isinstance(values, list):
+                    current = totals.setdefault(key, [0] * len(values))
+                    for i, value in enumerate(values):
+                        current[i] += value
+                else:
+                    totals[key] = totals.get(key, 0) + values
+        return totals
+
+    # ------------------ Exposition ------------------ #
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        by_name = {}
+        for (name, labels), values in sorted(self.merged().items()):
+            by_name.setdefault(name, []).append((labels, values))
+
+        lines = []
+        for name, (kind, help_text, buckets) in DEFINITIONS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, values in by_name.get(name, []):
+                if kind == 'counter':
+                    lines.append(f"{name}{_labels(labels)} {_number(values)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(values[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+METRICS = Metrics()
+
+
+def install(app, metrics=METRICS):
+    """Time every request of a Flask app and serve the metrics on /metrics."""
+    from flask import Response, request
+
+    @app.before_request
+    def _start_timer():
+        request.environ['metrics.start'] = perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = request.environ.get('metrics.start')
+        if start is not None:
+            # Route templates, not raw paths, keep the label set bounded
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            metrics.observe('http_request_duration_seconds', perf_counter() - start,
+                            route=route, method=request.method, status=str(response.status_code))
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
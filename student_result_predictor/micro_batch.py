@@ -0,0 +1,96 @@
+"""
+Micro-batching for concurrent single-row predictions.
+
+Request threads hand their validated feature row to a MicroBatcher and wait.
+One collector thread takes the first waiting row, keeps collecting until the
+window closes or the batch is full, answers the whole batch with a single
+vectorized call and wakes every caller with its own result. Needs a threaded
+server (e.g. gunicorn -k gthread) so several requests can wait at once.
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+class _Pending:
+    """One caller's row and, once the batch has run, its answer."""
+
+    __slots__ = ('features', 'answer', 'error', 'done')
+
+    def __init__(self, features):
+        self.features = features
+        self.answer = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Groups rows submitted within `window` seconds into one predict_many call."""
+
+    def __init__(self, predict_many, window, max_size):
+        self.predict_many = predict_many
+        self.window = window
+        self.max_size = max_size
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pid = None
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, features):
+        """Queue one row and block until its (label, probability) is ready."""
+        self._ensure_collector()
+        pending = _Pending(features)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.answer
+
+    def _ensure_collector(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._collect, name='micro-batch', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            answers = self.predict_many([pending.features for pending in batch])
+            for pending, answer in zip(batch, answers):
+                pending.answer = answer
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        self.batches += 1
+        self.rows += len(batch)
+        for pending in batch:
+            pending.done.set()
+
+    def stats(self):
+        """Batch counters, as exposed on /health."""
+        return {
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0
+        }
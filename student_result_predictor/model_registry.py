@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Versioned model registry with hot reload.
+
+Each published model is a directory under the registry root holding a
+manifest.json and one raw .npy file per compiled-tree array, plus the
+grade regressor's arrays when one was published with it:
+
+    model/registry/
+        CURRENT            # name of the active version, e.g. "v0003"
+        v0003/
+            manifest.json
+            feature.npy, threshold.npy, ...
+            regressor/feature.npy, ..., regressor/leaf_value.npy
+
+Loading memory-maps the arrays (no pickle, no NumPy, no sklearn), so
+forked workers share their pages. A watcher thread polls CURRENT and swaps a
+newly activated version in; requests already holding the old model finish
+with it.
+
+Usage:
+    python model_registry.py list
+    python model_registry.py publish model/dt_classifier.joblib --regressor model/dt_regressor.joblib
+    python model_registry.py activate v0002
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from npy_mmap import map_npy
+from tree_engine import (ARRAYS, ENSEMBLE_ARRAYS, REGRESSOR_ARRAYS, CompiledEnsemble, CompiledRegressor,
+                         CompiledTree, compile_classifier)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(BASE_DIR, 'model', 'registry')
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+REGRESSOR_DIR = 'regressor'
+FORMAT = 'compiled-tree/1'
+ENSEMBLE_FORMAT = 'compiled-ensemble/1'
+
+# .npy dtypes the tree arrays are stored with, by array.array typecode
+DTYPES = {'i': '<i4', 'd': '<f8'}
+
+
+def file_digest(path):
+    """SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _save_arrays(tree, names, directory):
+    """Save a compiled tree's arrays as .npy files, returning their manifest entries."""
+    import numpy as np
+
+    arrays = {}
+    for name, typecode in names:
+        values = np.asarray(getattr(tree, name), dtype=DTYPES[typecode])
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+        arrays[name] = {"dtype": DTYPES[typecode], "length": len(values)}
+    return arrays
+
+
+class LoadedModel:
+    """A compiled tree (and grade regressor, if any) with the manifest of its version."""
+
+    def __init__(self, version, path, manifest, engine, regressor=None):
+        self.version = version
+        self.path = path
+        self.manifest = manifest
+        self.engine = engine
+        self.regressor = regressor
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.path, MANIFEST_FILE)
+
+
+class ModelRegistry:
+    """Publishes, lists, activates and loads model versions under one root."""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def versions(self):
+        """Published version names, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def current_version(self):
+        """Name of the active version, or None if nothing is active."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version):
+        with open(os.path.join(self.root, version, MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def load(self, version=None):
+        """Map a version's arrays (the active one by default); None if there is none."""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        path = os.path.join(self.root, version)
+        manifest = self.manifest(version)
+        if manifest.get('format') == FORMAT:
+            arrays = {name: map_npy(os.path.join(path, f"{name}.npy")) for name, _ in ARRAYS}
+            engine = CompiledTree(classes=manifest['classes'], **arrays)
+        elif manifest.get('format') == ENSEMBLE_FORMAT:
+            arrays = {name: map_npy(os.path.join(path, f"{name}.npy")) for name, _ in ENSEMBLE_ARRAYS}
+            engine = CompiledEnsemble(classes=manifest['classes'], kind=manifest['kind'], base=manifest['base'],
+                                      **arrays)
+        else:
+            raise ValueError(f"Unsupported model format in {version}: {manifest.get('format')}")
+        regressor = None
+        if manifest.get('regressor'):
+            regressor = CompiledRegressor(**{
+                name: map_npy(os.path.join(path, REGRESSOR_DIR, f"{name}.npy")) for name, _ in REGRESSOR_ARRAYS
+            })
+        return LoadedModel(version, path, manifest, engine, regressor)
+
+    def publish(self, engine, source_path=None, activate=True, regressor=None, regressor_source=None,
+                regressor_r2=None):
+        """Write a compiled tree or ensemble (and optional regressor) as a new version, optionally activating it.
+
+        regressor_r2 is the regressor's held-out R², if known; the result page
+        only shows grades from a regressor that beat the mean (R² above 0).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        staging = os.path.join(self.root, f".staging-{os.getpid()}-{time.monotonic_ns()}")
+        os.makedirs(staging)
+        ensemble = isinstance(engine, CompiledEnsemble)
+        arrays = _save_arrays(engine, ENSEMBLE_ARRAYS if ensemble else ARRAYS, staging)
+
+        manifest = {
+            "format": ENSEMBLE_FORMAT if ensemble else FORMAT,
+            "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "classes": engine.classes,
+            "node_count": engine.node_count,
+            "arrays": arrays,
+            "source": os.path.basename(source_path) if source_path else None,
+            "source_sha256": file_digest(source_path) if source_path else None
+        }
+        if ensemble:
+            manifest.update(kind=engine.kind, base=engine.base, tree_count=engine.tree_count)
+        if regressor is not None:
+            regressor_dir = os.path.join(staging, REGRESSOR_DIR)
+            os.makedirs(regressor_dir)
+            manifest["regressor"] = {
+                "node_count": regressor.node_count,
+                "arrays": _save_arrays(regressor, REGRESSOR_ARRAYS, regressor_dir),
+                "source": os.path.basename(regressor_source) if regressor_source else None,
+                "source_sha256": file_digest(regressor_source) if regressor_source else None,
+                "r2": regressor_r2
+            }
+
+        # Claim the next free version name; rename is atomic, so a half-written
+        # version is never visible and concurrent publishers cannot collide
+        while True:
+            existing = self.versions()
+            version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+            manifest["version"] = version
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            try:
+                os.rename(staging, os.path.join(self.root, version))
+                break
+            except OSError:
+                if not os.path.exists(os.path.join(self.root, version)):
+                    raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Atomically point CURRENT at a published version."""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        tmp_path = os.path.join(self.root, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+    def find_source(self, source_path, regressor_source=None):
+        """Return the newest version published from this exact source file, if any.
+
+        With regressor_source, the version must also carry that exact regressor.
+        """
+        digest = file_digest(source_path)
+        regressor_digest = file_digest(regressor_source) if regressor_source else None
+        for version in reversed(self.versions()):
+            manifest = self.manifest(version)
+            if manifest.get('source_sha256') != digest:
+                continue
+            if regressor_digest and (manifest.get('regressor') or {}).get('source_sha256') != regressor_digest:
+                continue
+            return version
+        return None
+
+    def watch(self, loaded_version, on_swap, interval=5.0):
+        """Poll CURRENT in a daemon thread and call on_swap(LoadedModel) on change.
+
+        Threads do not survive fork, so the watcher is restarted in forked
+        children (e.g. gunicorn workers forked from a preloaded master).
+        """
+        state = {'version': loaded_version}
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    current = self.current_version()
+                    if current is not None and current != state['version']:
+                        on_swap(self.load(current))
+                        state['version'] = current
+                except Exception as e:
+                    print(f"Model reload failed, keeping {state['version']}: {e}")
+
+        def start():
+            thread = threading.Thread(target=poll, name='model-registry-watch', daemon=True)
+            thread.start()
+            return thread
+
+        os.register_at_fork(after_in_child=start)
+        return start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage published model versions")
+    parser.add_argument('--root', default=DEFAULT_ROOT, help="registry directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="show published versions")
+    publish = commands.add_parser('publish', help="compile a .joblib tree or ensemble classifier (and regressor) and publish it")
+    publish.add_argument('source')
+    publish.add_argument('--regressor', help="grade regressor (.joblib) to serve alongside the classifier")
+    publish.add_argument('--regressor-r2', type=float,
+                         help="the regressor's held-out R² (model/regression_r2.txt); grades are shown above 0")
+    publish.add_argument('--no-activate', action='store_true', help="publish without switching to it")
+    activate = commands.add_parser('activate', help="switch serving to a published version")
+    activate.add_argument('version')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        current = registry.current_version()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marker = '*' if version == current else ' '
+            grade = f"  + regressor {manifest['regressor']['source']}" if manifest.get('regressor') else ''
+            print(f"{marker} {version}  {manifest['created']}  {manifest['node_count']} nodes  {manifest['source']}{grade}")
+    elif args.command == 'publish':
+        import joblib
+
+        engine = compile_classifier(joblib.load(args.source))
+        regressor = CompiledRegressor.from_estimator(joblib.load(args.regressor)) if args.regressor else None
+        version = registry.publish(engine, args.source, activate=not args.no_activate,
+                                   regressor=regressor, regressor_source=args.regressor,
+                                   regressor_r2=args.regressor_r2)
+        print(f"Published {args.source} as {version}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"Activated {args.version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Memory-mapped access to .npy files without importing NumPy.
+
+Parses the .npy header and exposes the data as a typed memoryview over a
+read-only mmap. Indexing yields plain Python numbers, and every process
+mapping the same file shares its pages through the OS page cache.
+"""
+
+import ast
+import mmap
+import struct
+
+# .npy dtype descriptors and the matching memoryview formats
+FORMATS = {
+    '|u1': 'B',
+    '|i1': 'b',
+    '<u2': 'H',
+    '<i2': 'h',
+    '<i4': 'i',
+    '<i8': 'q',
+    '<f4': 'f',
+    '<f8': 'd',
+}
+
+
+def map_npy(path):
+    """Map a 1-D little-endian .npy file as a typed, read-only memoryview."""
+    with open(path, 'rb') as f:
+        if f.read(6) != b'\x93NUMPY':
+            raise ValueError(f"{path} is not a .npy file")
+        major = f.read(2)[0]
+        header_size = int.from_bytes(f.read(2 if major == 1 else 4), 'little')
+        header = ast.literal_eval(f.read(header_size).decode('latin1'))
+        fmt = FORMATS.get(header['descr'])
+        if fmt is None or header['fortran_order'] or len(header['shape']) != 1:
+            raise ValueError(f"{path} is not a flat array of a supported dtype")
+        offset = f.tell()
+        size = header['shape'][0] * struct.calcsize(fmt)
+        if size == 0:
+            return memoryview(b'').cast(fmt)
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapping)[offset:offset + size].cast(fmt)
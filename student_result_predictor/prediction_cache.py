@@ -0,0 +1,62 @@
+"""
+Bounded LRU cache for single-row predictions.
+
+Traffic repeats the same handful of feature tuples (form defaults especially),
+so answers are kept keyed on the normalized 5-feature tuple. Each cache
+belongs to one Predictor, which serves one immutable registry version;
+activating another version builds a new Predictor with an empty cache, so a
+new model never serves stale answers.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping of feature tuples to answer tuples (label, probability, grade)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(features):
+        """Normalize a feature row so 5 and 5.0 share an entry."""
+        return tuple(float(value) for value in features)
+
+    def get(self, key):
+        """Return the cached answer for key, or None on a miss."""
+        with self._lock:
+            answer = self._entries.get(key)
+            if answer is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, key, answer):
+        """Store an answer, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Counters for sizing the cache, as exposed on /health."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,113 @@
+"""
+Prediction path shared by the serving apps.
+
+Tries, in order, the LRU cache, the precomputed answer table and the compiled
+tree, so every app gets the same fast path without repeating the plumbing.
+predict_many does the same for a micro-batch, sending the misses to the tree
+in one vectorized call once there are enough of them.
+
+Answers are (label, probability, grade) tuples. When the model version has a
+grade regressor, every source answers both at once: the cache and answer
+table store the triple, and on a miss both trees walk the same float32 row.
+Without one the grade is None.
+"""
+
+import os
+
+from answer_table import AnswerTable
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from tree_engine import predict_combined, predict_combined_one
+
+# Entries kept by the prediction cache; 0 disables it
+CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+
+# How often to check the registry for a newly activated model; 0 disables it
+MODEL_POLL_SECONDS = float(os.environ.get('MODEL_POLL_SECONDS', 5))
+
+# Below this many rows walking the tree per row beats one vectorized call
+VECTORIZE_MIN_ROWS = 64
+
+
+class Predictor:
+    """Answers one feature row with the cheapest source available."""
+
+    def __init__(self, engine, answer_table=None, cache=None, version=None, regressor=None, grade_r2=None):
+        self.engine = engine
+        self.answer_table = answer_table
+        self.cache = cache
+        self.version = version
+        self.regressor = regressor
+        self.grade_r2 = grade_r2
+
+    @classmethod
+    def from_loaded(cls, loaded):
+        """Build the fast path for a model version loaded from the registry."""
+        answer_table = AnswerTable.load(loaded.path, loaded.manifest_path)
+        cache = PredictionCache(CACHE_SIZE) if CACHE_SIZE > 0 else None
+        grade_r2 = (loaded.manifest.get('regressor') or {}).get('r2')
+        return cls(loaded.engine, answer_table, cache, loaded.version, loaded.regressor, grade_r2)
+
+    @property
+    def grade_beats_mean(self):
+        """Whether the grade regressor's held-out R² was above 0 (unknown counts as no)."""
+        return self.grade_r2 is not None and self.grade_r2 > 0
+
+    @classmethod
+    def load(cls, registry=None):
+        """Load the active registry version, or return None if nothing is published."""
+        loaded = (registry or ModelRegistry()).load()
+        return cls.from_loaded(loaded) if loaded is not None else None
+
+    def predict_one(self, features):
+        """Return (label, probability of that label, grade or None) for one row of features."""
+        key = None
+        if self.cache is not None:
+            key = PredictionCache.key(features)
+            answer = self.cache.get(key)
+            if answer is not None:
+                return answer
+
+        answer = self.answer_table.lookup(features) if self.answer_table is not None else None
+        if answer is None:
+            answer = predict_combined_one(self.engine, self.regressor, features)
+
+        if key is not None:
+            self.cache.put(key, answer)
+        return answer
+
+    def predict_many(self, rows):
+        """Return (label, probability, grade) per row, with one vectorized call for the misses."""
+        answers = [None] * len(rows)
+        keys = [None] * len(rows)
+        misses = []
+        for i, features in enumerate(rows):
+            if self.cache is not None:
+                keys[i] = PredictionCache.key(features)
+                answers[i] = self.cache.get(keys[i])
+            if answers[i] is None and self.answer_table is not None:
+                answers[i] = self.answer_table.lookup(features)
+            if answers[i] is None:
+                misses.append(i)
+
+        if 0 < len(misses) < VECTORIZE_MIN_ROWS:
+            for i in misses:
+                answers[i] = predict_combined_one(self.engine, self.regressor, rows[i])
+        elif misses:
+            labels, probabilities, grades = self.predict_matrix([rows[i] for i in misses])
+            grades = grades.tolist() if grades is not None else [None] * len(misses)
+            for i, label, probability, grade in zip(misses, labels.tolist(), probabilities.tolist(), grades):
+                answers[i] = (label, probability, grade)
+
+        if self.cache is not None:
+            for key, answer in zip(keys, answers):
+                self.cache.put(key, answer)
+        return answers
+
+    def predict_matrix(self, X):
+        """(labels, probabilities, grades or None) arrays for a 2-D feature array, straight from the trees."""
+        return predict_combined(self.engine, self.regressor, X)
+
+    def cache_stats(self):
+        """Cache counters, or None when caching is disabled."""
+        return self.cache.stats() if self.cache is not None else None
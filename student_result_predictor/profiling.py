@@ -0,0 +1,155 @@
+"""
+Opt-in request profiling with flamegraph output.
+
+A request is profiled when it is picked by PROFILE_SAMPLE_RATE or carries an
+X-Profile header equal to PROFILE_SECRET. The whole WSGI call (Flask routing,
+the handler, NumPy and other C calls) is traced on that request's thread
+only, and the time spent in every distinct stack is added to a per-process
+collapsed-stack file in PROFILE_DIR:
+
+    POST /predict;flask/app.py:wsgi_app;...;backend_api.py:predict 412
+
+(one line per stack, weight in microseconds), which flamegraph.pl, inferno
+and speedscope read directly. When neither setting is given nothing is
+installed, so requests pay nothing.
+"""
+
+import atexit
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# Fraction of requests to profile (0 disables sampling)
+SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# Requests with an X-Profile header equal to this are always profiled
+SECRET = os.environ.get('PROFILE_SECRET', '')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'student-predictor-profiles'))
+# Profiled requests rewrite the aggregated file at most this often
+FLUSH_SECONDS = float(os.environ.get('PROFILE_FLUSH_SECONDS', 5))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StackTracer:
+    """Attributes wall time to call stacks on the current thread via sys.setprofile."""
+
+    def __init__(self, root):
+        self.stacks = Counter()
+        self._stack = [root]
+        self._names = {}
+        self._last = 0
+
+    def start(self):
+        self._last = time.perf_counter_ns()
+        sys.setprofile(self._event)
+
+    def stop(self):
+        sys.setprofile(None)
+        self.stacks[tuple(self._stack)] += time.perf_counter_ns() - self._last
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        self.stacks[tuple(self._stack)] += now - self._last
+        if event == 'call':
+            self._stack.append(self._frame_name(frame.f_code))
+        elif event == 'c_call':
+            self._stack.append(self._c_name(arg))
+        elif len(self._stack) > 1:  # return, c_return, c_exception
+            self._stack.pop()
+        self._last = time.perf_counter_ns()
+
+    def _frame_name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = f"{_short_path(code.co_filename)}:{code.co_name}".replace(';', ':')
+        return name
+
+    def _c_name(self, func):
+        module = getattr(func, '__module__', None) or type(getattr(func, '__self__', None)).__name__
+        return f"{module}.{getattr(func, '__qualname__', func.__name__)}".replace(';', ':')
+
+
+def _short_path(filename):
+    """Path relative to site-packages or the project, for readable frame names."""
+    for marker in ('site-packages' + os.sep, 'dist-packages' + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    if filename.startswith(BASE_DIR):
+        return os.path.relpath(filename, BASE_DIR)
+    return os.path.basename(filename)
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that traces sampled or secret-flagged requests."""
+
+    def __init__(self, wsgi_app, sample_rate=SAMPLE_RATE, secret=SECRET, directory=PROFILE_DIR):
+        self.wsgi_app = wsgi_app
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.directory = directory
+        self.stacks = Counter()
+        self.profiled = 0
+        self._lock = threading.Lock()
+        self._next_flush = 0
+        atexit.register(self.flush)
+
+    def _wanted(self, environ):
+        header = environ.get('HTTP_X_PROFILE')
+        if header and self.secret and hmac.compare_digest(header.encode(), self.secret.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ):
+            return self.wsgi_app(environ, start_response)
+
+        tracer = StackTracer(f"{environ.get('REQUEST_METHOD')} {environ.get('PATH_INFO')}")
+        tracer.start()
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            tracer.stop()
+            self._record(tracer.stacks)
+
+    def _record(self, stacks):
+        with self._lock:
+            for stack, nanoseconds in stacks.items():
+                self.stacks[stack] += nanoseconds
+            self.profiled += 1
+            due = time.monotonic() >= self._next_flush
+        if due:
+            self.flush()
+
+    @property
+    def path(self):
+        # Per process, so gunicorn workers never write to the same file
+        return os.path.join(self.directory, f"profile-{os.getpid()}.collapsed")
+
+    def flush(self):
+        """Rewrite this process's collapsed-stack file with everything recorded so far."""
+        with self._lock:
+            if not self.stacks:
+                return
+            lines = [f"{';'.join(stack)} {nanoseconds // 1000}" for stack, nanoseconds in self.stacks.items()
+                     if nanoseconds >= 1000]
+            self._next_flush = time.monotonic() + FLUSH_SECONDS
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
+
+
+def install(app):
+    """Wrap a Flask app for profiling if PROFILE_SAMPLE_RATE or PROFILE_SECRET is set."""
+    if SAMPLE_RATE <= 0 and not SECRET:
+        return None
+    app.wsgi_app = middleware = ProfilingMiddleware(app.wsgi_app)
+    print(f"Request profiling on (sample rate {SAMPLE_RATE}, secret header {'set' if SECRET else 'off'}), "
+          f"writing to {PROFILE_DIR}")
+    return middleware
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Offline batch scoring for students.csv-shaped files of any size.
+
+The input is read in fixed-size byte chunks cut at line boundaries. Worker
+processes parse each chunk with narrow integer dtypes, validate it, score it
+with the compiled tree from the model registry and hand the scored chunk back.
+Results are written in input order as they complete, with at most a few
+chunks per worker in flight, so memory use does not depend on the file size.
+
+Usage:
+    python score.py students.csv scored.csv
+    python score.py big.csv scored.parquet --workers 8 --chunk-mb 32
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_NAMES, validate_batch
+from model_registry import DEFAULT_ROOT, ModelRegistry
+
+# Every valid value has at most 3 digits; int16 parsing silently wraps values
+# with 5 or more, so chunks containing such numbers take the slow path
+PARSE_DTYPE = 'int16'
+LONG_NUMBER = re.compile(rb'\d{5}')
+
+OUTPUT_COLUMNS = FEATURE_NAMES + ['prediction', 'probability', 'error']
+
+# Set in each worker by _init_worker
+_engine = None
+
+
+def _init_worker(registry_root, version):
+    """Map the model once per worker process."""
+    global _engine
+    loaded = ModelRegistry(registry_root).load(version)
+    if loaded is None:
+        raise RuntimeError(f"No model published in {registry_root}")
+    _engine = loaded.engine
+
+
+def _parse_chunk(block, columns):
+    """Parse a chunk of CSV lines into a frame holding the feature columns."""
+    if not LONG_NUMBER.search(block):
+        try:
+            return pd.read_csv(io.BytesIO(block), header=None, names=columns,
+                               usecols=FEATURE_NAMES, dtype={name: PARSE_DTYPE for name in FEATURE_NAMES})
+        except ValueError:
+            pass
+    # Non-integer or oversized values: parse loosely and let validation flag them
+    frame = pd.read_csv(io.BytesIO(block), header=None, names=columns, usecols=FEATURE_NAMES, dtype=str)
+    return frame.apply(pd.to_numeric, errors='coerce')
+
+
+def score_chunk(block, columns, output_format):
+    """Parse, validate and score one chunk; returns (row count, scored output)."""
+    frame = _parse_chunk(block, columns)[FEATURE_NAMES]
+    features = frame.to_numpy(dtype=np.float64)
+    valid, errors = validate_batch(features)
+
+    prediction = np.full(len(frame), '', dtype=object)
+    probability = np.full(len(frame), np.nan)
+    error = np.full(len(frame), '', dtype=object)
+    if valid.any():
+        labels, prob = _engine.predict(features[valid])
+        prediction[valid] = np.where(labels == 1, 'Pass', 'Fail')
+        probability[valid] = np.round(prob * 100, 2)
+    for row, messages in errors.items():
+        error[row] = '; '.join(messages)
+
+    if output_format == 'parquet':
+        # Every row group must share one schema, whichever parse path a chunk took
+        frame = frame.astype(np.float32)
+    scored = frame.assign(prediction=prediction, probability=probability, error=error)
+    if output_format == 'csv':
+        # %g keeps whole numbers from loosely parsed chunks looking like integers
+        return len(scored), scored.to_csv(index=False, header=False, float_format='%g').encode()
+    return len(scored), scored
+
+
+def read_chunks(f, chunk_bytes):
+    """Yield blocks of roughly chunk_bytes that always end on a line boundary."""
+    while True:
+        block = f.read(chunk_bytes)
+        if not block:
+            return
+        if not block.endswith(b'\n'):
+            block += f.readline()
+        if block.strip():
+            yield block
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write((','.join(OUTPUT_COLUMNS) + '\n').encode())
+
+    def write(self, scored):
+        self.file.write(scored)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Writes each scored chunk as one Parquet row group (needs pyarrow)."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.writer = None
+
+    def write(self, scored):
+        table = self.pa.Table.from_pandas(scored, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def score_file(input_path, output_path, workers, chunk_mb, registry_root=DEFAULT_ROOT, version=None):
+    """Score input_path into output_path, returning (rows, seconds)."""
+    output_format = 'parquet' if output_path.endswith('.parquet') else 'csv'
+    sink = ParquetSink(output_path) if output_format == 'parquet' else CsvSink(output_path)
+    chunk_bytes = int(chunk_mb * 1024 * 1024)
+
+    start = time.perf_counter()
+    last_report = start
+    rows = 0
+    with open(input_path, 'rb') as f:
+        columns = f.readline().decode().strip().split(',')
+        missing = [name for name in FEATURE_NAMES if name not in columns]
+        if missing:
+            raise SystemExit(f"{input_path} is missing columns: {', '.join(missing)}")
+
+        if workers == 1:
+            _init_worker(registry_root, version)
+            results = (score_chunk(block, columns, output_format) for block in read_chunks(f, chunk_bytes))
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(registry_root, version))
+            results = _ordered(pool, read_chunks(f, chunk_bytes), columns, output_format, workers * 2)
+
+        try:
+            for count, scored in results:
+                sink.write(scored)
+                rows += count
+                now = time.perf_counter()
+                if now - last_report >= 5:
+                    print(f"  {rows:,} rows, {rows / (now - start):,.0f} rows/sec", file=sys.stderr)
+                    last_report = now
+        finally:
+            sink.close()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    return rows, time.perf_counter() - start
+
+
+def _ordered(pool, chunks, columns, output_format, window):
+    """Submit chunks to the pool and yield results in input order.
+
+    At most `window` chunks are in flight, which bounds memory use.
+    """
+    pending = deque()
+    for block in chunks:
+        pending.append(pool.submit(score_chunk, block, columns, output_format))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a students.csv-shaped file with the active model")
+    parser.add_argument('input', help="CSV with the students.csv feature columns")
+    parser.add_argument('output', help="output .csv or .parquet file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="scoring processes")
+    parser.add_argument('--chunk-mb', type=float, default=16, help="input chunk size in MB")
+    parser.add_argument('--registry', default=DEFAULT_ROOT, help="model registry directory")
+    parser.add_argument('--model-version', help="registry version to use (default: active)")
+    args = parser.parse_args()
+
+    rows, seconds = score_file(args.input, args.output, args.workers, args.chunk_mb,
+                               args.registry, args.model_version)
+    print(f"Scored {rows:,} rows in {seconds:.2f}s ({rows / seconds:,.0f} rows/sec) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
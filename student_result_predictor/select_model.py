@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Latency-budgeted model selection for the pass/fail classifier.
+
+Fits the candidates below in parallel (one process each): the decision tree
+searched over PARAM_GRID exactly as train_model.py does, plus random forests
+and gradient boosting. Each is then measured on this machine the way the apps
+would serve it, compiled with tree_engine: single-row latency (p50/p99 of
+predict_one over held-out rows, one at a time), batch latency (one vectorized
+predict over BATCH_ROWS rows) and artifact size (pickled and compiled). The
+candidate with the best cross-validated accuracy (on the training split)
+whose single-row p99 fits the budget wins; between equally accurate ones the
+faster wins. Only the winner is then scored on the held-out split, so the
+accuracy reported for it was not used to pick it.
+
+Writes to --out-dir (default model/selection):
+    report.json                  CV accuracy, latency and size of every candidate,
+                                 plus the winner's held-out accuracy
+    report.md                    the same as a table, winner marked
+    selected_classifier.joblib   the winning estimator
+
+Usage:
+    python select_model.py --p99-budget-us 100
+    python select_model.py --p99-budget-us 500 --publish --regressor model/dt_regressor.joblib
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import joblib
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from train_model import DEFAULT_CSV, SEED, classification_split, classifier_search, load_dataset, train_classifier
+from tree_engine import compile_classifier
+
+# Candidates by name; None is the searched decision tree from train_model.py
+CANDIDATES = {
+    'decision_tree': None,
+    'random_forest_25': RandomForestClassifier(n_estimators=25, max_depth=10, class_weight='balanced',
+                                               random_state=SEED),
+    'random_forest_100': RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=SEED),
+    'gradient_boosting_50': GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=SEED),
+    'gradient_boosting_200': GradientBoostingClassifier(n_estimators=200, max_depth=3, random_state=SEED),
+}
+
+# Folds of the cross-validation candidates are compared on; shuffled, so they
+# differ from the ones the tree's grid search picks its parameters on
+CV_FOLDS = 5
+CV_SPLIT = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=SEED)
+
+# Single-row calls timed per candidate, and rows per timed batch call
+SINGLE_ROW_CALLS = 3000
+BATCH_ROWS = 1000
+WARMUP_CALLS = 300
+
+
+# ------------------ Training ------------------ #
+
+def fit_candidate(name, estimator, X, y_class):
+    """Fit one candidate on the training split; returns (name, model, CV accuracy %, seconds).
+
+    Every candidate is scored on the same CV_SPLIT folds of the training split;
+    the held-out split is kept for scoring the winner. The tree's grid search
+    runs inside each fold (nested CV), since the best score of the search
+    itself is the maximum over its grid and reads high.
+    """
+    start = time.perf_counter()
+    X_train, _, y_train, _ = classification_split(X, y_class)
+    if estimator is None:
+        model, _ = train_classifier(X, y_class, cv=CV_FOLDS, n_jobs=1)
+        estimator = classifier_search(cv=CV_FOLDS, n_jobs=1)
+    else:
+        model = clone(estimator).fit(X_train, y_train)
+    scores = cross_val_score(clone(estimator), X_train, y_train, cv=CV_SPLIT, scoring='accuracy')
+    cv_accuracy = round(scores.mean() * 100, 2)
+    return name, model, cv_accuracy, round(time.perf_counter() - start, 3)
+
+
+# ------------------ Measurement ------------------ #
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def measure(engine, rows):
+    """Serving latency of a compiled model: single-row percentiles (us) and one batch call (ms)."""
+    import numpy as np
+
+    for i in range(WARMUP_CALLS):
+        engine.predict_one(rows[i % len(rows)])
+    timings = []
+    for i in range(SINGLE_ROW_CALLS):
+        features = rows[i % len(rows)]
+        start = time.perf_counter_ns()
+        engine.predict_one(features)
+        timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+
+    batch = np.array([rows[i % len(rows)] for i in range(BATCH_ROWS)], dtype=np.float64)
+    engine.predict(batch)
+    batch_seconds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        engine.predict(batch)
+        batch_seconds.append(time.perf_counter() - start)
+
+    return {
+        "single_p50_us": round(percentile(timings, 50) / 1000, 2),
+        "single_p99_us": round(percentile(timings, 99) / 1000, 2),
+        "batch_ms": round(sorted(batch_seconds)[2] * 1000, 3),
+    }
+
+
+def artifact_sizes(model, engine):
+    """Bytes of the pickled estimator and of the compiled arrays the apps map."""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    compiled = sum(
+        len(values) * values.itemsize for values in vars(engine).values()
+        if hasattr(values, 'itemsize')
+    )
+    return {"joblib_bytes": len(buffer.getvalue()), "compiled_bytes": compiled}
+
+
+# ------------------ Report ------------------ #
+
+def write_report(report, out_dir):
+    with open(os.path.join(out_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    lines = [
+        f"# Model selection ({report['created']})",
+        "",
+        f"Budget: single-row p99 <= {report['p99_budget_us']} us. "
+        f"Winner: **{report['winner'] or 'none'}**"
+        + (f", {report['winner_holdout_accuracy']}% accuracy on the held-out split." if report['winner'] else "."),
+        "",
+        f"| candidate | {CV_FOLDS}-fold CV accuracy % | p50 us | p99 us | batch of "
+        f"{BATCH_ROWS} ms | joblib KB | compiled KB | fit s | within budget |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for c in report['candidates']:
+        name = f"**{c['name']}**" if c['name'] == report['winner'] else c['name']
+        lines.append(
+            f"| {name} | {c['cv_accuracy']} | {c['single_p50_us']} | {c['single_p99_us']} | {c['batch_ms']} | "
+            f"{c['joblib_bytes'] / 1024:.1f} | {c['compiled_bytes'] / 1024:.1f} | {c['fit_seconds']} | "
+            f"{'yes' if c['within_budget'] else 'no'} |"
+        )
+    with open(os.path.join(out_dir, 'report.md'), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the most accurate classifier within a latency budget")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="training data")
+    parser.add_argument('--out-dir', default=os.path.join('model', 'selection'), help="report and winner")
+    parser.add_argument('--p99-budget-us', type=float, default=float(os.environ.get('P99_BUDGET_US', 100)),
+                        help="single-row p99 inference budget in microseconds (default 100)")
+    parser.add_argument('--jobs', type=int, default=-1, help="candidates fitted in parallel (-1 = all cores)")
+    parser.add_argument('--publish', action='store_true', help="publish the winner to the model registry")
+    parser.add_argument('--regressor', help="with --publish: grade regressor to serve alongside the winner")
+    args = parser.parse_args()
+
+    X, y_class, y_reg = load_dataset(args.csv)
+    start = time.perf_counter()
+    fitted = joblib.Parallel(n_jobs=args.jobs)(
+        joblib.delayed(fit_candidate)(name, estimator, X, y_class) for name, estimator in CANDIDATES.items()
+    )
+    print(f"Fitted {len(fitted)} candidates in {time.perf_counter() - start:.2f}s")
+
+    # Measured one after another, so candidates never compete for the CPU
+    _, X_test, _, y_test = classification_split(X, y_class)
+    rows = X_test.to_numpy(dtype=float).tolist()
+    candidates = []
+    models = {}
+    for name, model, cv_accuracy, fit_seconds in fitted:
+        engine = compile_classifier(model)
+        result = {"name": name, "cv_accuracy": cv_accuracy, "fit_seconds": fit_seconds,
+                  **measure(engine, rows), **artifact_sizes(model, engine)}
+        result["within_budget"] = result["single_p99_us"] <= args.p99_budget_us
+        candidates.append(result)
+        models[name] = model
+        print(f"{name:24s} CV accuracy {cv_accuracy:6.2f}%  p99 {result['single_p99_us']:8.2f} us  "
+              f"batch {result['batch_ms']:7.3f} ms  {'ok' if result['within_budget'] else 'over budget'}")
+
+    feasible = [c for c in candidates if c['within_budget']]
+    winner = max(feasible, key=lambda c: (c['cv_accuracy'], -c['single_p99_us']))['name'] if feasible else None
+    # Scored once, after the choice, so the number is an unbiased estimate
+    holdout_accuracy = None
+    if winner is not None:
+        holdout_accuracy = round(accuracy_score(y_test, models[winner].predict(X_test)) * 100, 2)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "dataset": {"path": args.csv, "rows": len(X)},
+        "p99_budget_us": args.p99_budget_us,
+        "winner": winner,
+        "winner_holdout_accuracy": holdout_accuracy,
+        "candidates": candidates,
+    }
+    write_report(report, args.out_dir)
+    print(f"Report saved to {os.path.join(args.out_dir, 'report.md')}")
+    if winner is None:
+        raise SystemExit(f"No candidate meets a single-row p99 of {args.p99_budget_us} us")
+
+    winner_path = os.path.join(args.out_dir, 'selected_classifier.joblib')
+    joblib.dump(models[winner], winner_path)
+    print(f"Selected {winner} ({holdout_accuracy}% on the held-out split), saved to {winner_path}")
+
+    if args.publish:
+        from model_registry import ModelRegistry
+        from train_model import holdout_r2
+        from tree_engine import CompiledRegressor
+
+        regressor = r2 = None
+        if args.regressor:
+            estimator = joblib.load(args.regressor)
+            regressor = CompiledRegressor.from_estimator(estimator)
+            r2 = holdout_r2(estimator, X, y_reg)
+        version = ModelRegistry().publish(compile_classifier(models[winner]), winner_path,
+                                          regressor=regressor, regressor_source=args.regressor, regressor_r2=r2)
+        print(f"Published {winner} as {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-process snapshot files, for numbers merged across gunicorn workers.
+
+Each process rewrites <directory>/<prefix>-<pid>-<ns>.json about once a
+second from a background thread; a reader adds the files of every other
+process to its own live values.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+# Directory for the snapshots of metrics.py and drift.py (unset: single-process numbers)
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+
+class Snapshots:
+    """Snapshot file of this process plus the readable snapshots of its siblings.
+
+    collect() returns the JSON-serializable values to write, or None if they
+    have not changed since the last write.
+    """
+
+    def __init__(self, directory, prefix, collect, seconds=1.0):
+        self.directory = directory
+        self.prefix = prefix
+        self.collect = collect
+        self.seconds = seconds
+        self.path = None
+        self._pid = None
+
+    def start(self):
+        """Begin writing this process's snapshot; call once per process, after any fork."""
+        self._pid = os.getpid()
+        if not self.directory:
+            return
+        self.path = os.path.join(self.directory, f"{self.prefix}-{self._pid}-{time.time_ns()}.json")
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._flush_loop, name=f'{self.prefix}-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.seconds)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Could not write {self.prefix} snapshot: {e}")
+
+    def flush(self):
+        """Write this process's values if they changed."""
+        if self.path is None or self._pid != os.getpid():
+            return
+        values = self.collect()
+        if values is None:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(values, f)
+        os.replace(tmp_path, self.path)
+
+    def others(self):
+        """Values of every other process's snapshot (unreadable files are skipped)."""
+        if not self.directory:
+            return
+        for path in glob.glob(os.path.join(self.directory, f'{self.prefix}-*.json')):
+            if path == self.path:
+                continue
+            try:
+                with open(path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
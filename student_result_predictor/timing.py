@@ -0,0 +1,45 @@
+"""
+Per-request stage timing for the predict handlers.
+
+Handlers call mark() after each stage (parse, validate, inference, render).
+The durations feed the per-stage histograms on /metrics and, when
+SERVER_TIMING=1, are returned in a standard Server-Timing response header,
+which the benchmark suite reads to break latency down by stage. Recording
+costs one perf_counter() call per stage.
+"""
+
+import os
+from time import perf_counter
+
+from metrics import METRICS
+
+# Attach a Server-Timing header to instrumented responses
+SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
+
+
+class RequestTimer:
+    """Durations of consecutive named stages within one request."""
+
+    __slots__ = ('start', 'stages', '_last')
+
+    def __init__(self):
+        self.start = self._last = perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        """Close the current stage under `stage` and start the next one."""
+        now = perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def header(self):
+        """Server-Timing header value, durations in milliseconds."""
+        return ', '.join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages)
+
+    def attach(self, response):
+        """Record the stage durations and add the Server-Timing header when enabled."""
+        for stage, seconds in self.stages:
+            METRICS.observe('predict_stage_duration_seconds', seconds, stage=stage)
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = self.header()
+        return response
@@ -1,107 +1,324 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor, plot_tree
-from sklearn.metrics import classification_report, accuracy_score, confusion_matrix, mean_absolute_error, mean_squared_error, r2_score
-import joblib
-import os
-import matplotlib.pyplot as plt
-import numpy as np
-
-# ------------------ Load Dataset Safely ------------------ #
-
-current_dir = os.path.dirname(os.path.abspath(__file__))
-csv_path = os.path.join(current_dir, "students.csv")
-
-print("Looking for file at:", csv_path)
-
-df = pd.read_csv(csv_path)
-
-# Ensure numeric types
-for col in ['study_hours', 'sleep_hours', 'absences', 'assignments_completed', 'exam_score']:
-    df[col] = pd.to_numeric(df[col], errors='coerce')
-
-df.dropna(inplace=True)
-
-# Features and labels
-feature_cols = ['study_hours', 'sleep_hours', 'absences', 'assignments_completed', 'exam_score']
-X = df[feature_cols]
-
-# ------------------ Classification Model (Pass/Fail) ------------------ #
-
-y_class = df['result'].map({'Fail': 0, 'Pass': 1})
-
-X_train, X_test, y_train_cls, y_test_cls = train_test_split(
-    X, y_class, test_size=0.25, random_state=42, stratify=y_class
-)
-
-clf = DecisionTreeClassifier(random_state=42, max_depth=6, min_samples_split=10, class_weight='balanced')
-clf.fit(X_train, y_train_cls)
-
-y_pred_cls = clf.predict(X_test)
-accuracy = round(accuracy_score(y_test_cls, y_pred_cls) * 100, 2)
-
-print("✅ Classification Accuracy:", accuracy, "%")
-print("\nConfusion Matrix:\n", confusion_matrix(y_test_cls, y_pred_cls))
-print("\nClassification Report:\n", classification_report(y_test_cls, y_pred_cls))
-
-# Save model
-os.makedirs("model", exist_ok=True)
-joblib.dump(clf, "model/dt_classifier.joblib")
-with open("model/accuracy.txt", "w") as f:
-    f.write(str(accuracy))
-
-# ------------------ Regression Model (Grade Prediction) ------------------ #
-
-y_reg = df['exam_score']  # Or replace with actual grade column if you have one
-
-X_train, X_test, y_train_reg, y_test_reg = train_test_split(
-    X, y_reg, test_size=0.25, random_state=42
-)
-
-reg = DecisionTreeRegressor(random_state=42, max_depth=6, min_samples_split=10)
-reg.fit(X_train, y_train_reg)
-
-y_pred_reg = reg.predict(X_test)
-
-# Regression Metrics
-mae = mean_absolute_error(y_test_reg, y_pred_reg)
-mse = mean_squared_error(y_test_reg, y_pred_reg)
-rmse = np.sqrt(mse)
-r2 = r2_score(y_test_reg, y_pred_reg)
-
-print("\n📈 Regression Model Performance:")
-print("MAE:", round(mae, 2))
-print("MSE:", round(mse, 2))
-print("RMSE:", round(rmse, 2))
-print("R² Score:", round(r2, 2))
-
-# Save regression model & score
-joblib.dump(reg, "model/dt_regressor.joblib")
-with open("model/regression_r2.txt", "w") as f:
-    f.write(str(round(r2, 2)))
-
-# ------------------ Visualization ------------------ #
-
-# Classification Tree
-plt.figure(figsize=(12, 8))
-plot_tree(clf, feature_names=feature_cols, class_names=['Fail', 'Pass'], filled=True)
-plt.title("Decision Tree - Classification (Pass/Fail)")
-plt.savefig("model/decision_tree_classifier.png")
-plt.show()
-
-# Regression Tree
-plt.figure(figsize=(12, 8))
-plot_tree(reg, feature_names=feature_cols, filled=True)
-plt.title("Decision Tree - Regression (Grade Prediction)")
-plt.savefig("model/decision_tree_regressor.png")
-plt.show()
-
-# ------------------ Actual vs Predicted Scatter Plot ------------------ #
-
-plt.figure(figsize=(8, 6))
-plt.scatter(y_test_reg, y_pred_reg, alpha=0.7)
-plt.xlabel("Actual Grades")
-plt.ylabel("Predicted Grades")
-plt.title("Actual vs Predicted Grades (Regression)")
-plt.savefig("model/actual_vs_predicted_regression.png")
-plt.show()
+#!/usr/bin/env python3
+"""
+Training pipeline for the pass/fail classifier and the grade regressor.
+
+Runs a cross-validated hyperparameter search for both trees in parallel
+across cores, fits the classifier and the regressor concurrently, saves the
+models and metrics to model/, and records the time spent in every stage in
+model/training_report.json. Plots are only rendered with --plot, headless.
+The CSV is read through the columnar cache in dataset_cache.py, so only the
+first run on a given file pays for parsing it.
+
+Usage:
+    python train_model.py
+    python train_model.py --plot --publish
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, accuracy_score, confusion_matrix, mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from dataset_cache import DEFAULT_CACHE_DIR, LABEL, load_columns
+from features import FEATURE_NAMES, GRADE_TARGET, REGRESSOR_FEATURES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(BASE_DIR, "students.csv")
+
+# Held-out share of the data and the seed for splits and trees
+TEST_SIZE = 0.25
+SEED = 42
+
+# Hyperparameters searched for both trees
+PARAM_GRID = {
+    'max_depth': [4, 6, 8, 10],
+    'min_samples_split': [2, 10, 20],
+    'min_samples_leaf': [1, 5],
+}
+
+
+class StageTimer:
+    """Collects wall-clock seconds per named pipeline stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(time.perf_counter() - start, 4)
+
+
+# ------------------ Load Dataset Safely ------------------ #
+
+def load_dataset(csv_path=DEFAULT_CSV, cache_dir=DEFAULT_CACHE_DIR):
+    """Read the students CSV, returning features, pass/fail labels and grades.
+
+    Uses the memory-mapped columnar cache unless cache_dir is None.
+    """
+    print("Looking for file at:", csv_path)
+    if cache_dir is not None:
+        columns = load_columns(csv_path, cache_dir)
+        X = pd.DataFrame({name: columns[name] for name in FEATURE_NAMES})
+        y_class = pd.Series(columns[LABEL].view(np.uint8), name='result')  # Fail = 0, Pass = 1
+        y_reg = X[GRADE_TARGET]
+        return X, y_class, y_reg
+
+    df = pd.read_csv(csv_path)
+
+    # Ensure numeric types
+    for col in FEATURE_NAMES:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df.dropna(inplace=True)
+
+    X = df[FEATURE_NAMES]
+    y_class = df['result'].map({'Fail': 0, 'Pass': 1})
+    y_reg = df[GRADE_TARGET]  # Or replace with actual grade column if you have one
+    return X, y_class, y_reg
+
+
+# ------------------ Classification Model (Pass/Fail) ------------------ #
+
+def classification_split(X, y_class):
+    """(X_train, X_test, y_train, y_test) used to fit and score every pass/fail model."""
+    return train_test_split(X, y_class, test_size=TEST_SIZE, random_state=SEED, stratify=y_class)
+
+
+def classifier_search(cv=5, n_jobs=-1):
+    """The unfitted grid search over PARAM_GRID behind the pass/fail tree."""
+    return GridSearchCV(
+        DecisionTreeClassifier(random_state=SEED, class_weight='balanced'),
+        PARAM_GRID, cv=cv, scoring='accuracy', n_jobs=n_jobs
+    )
+
+
+def train_classifier(X, y_class, cv=5, n_jobs=-1):
+    """Search and fit the pass/fail tree, returning (model, metrics)."""
+    X_train, X_test, y_train, y_test = classification_split(X, y_class)
+
+    search = classifier_search(cv, n_jobs)
+    search.fit(X_train, y_train)
+    clf = search.best_estimator_
+
+    y_pred = clf.predict(X_test)
+    return clf, {
+        "best_params": search.best_params_,
+        "cv_accuracy": round(search.best_score_ * 100, 2),
+        "accuracy": round(accuracy_score(y_test, y_pred) * 100, 2),
+        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
+        "report": classification_report(y_test, y_pred)
+    }
+
+
+# ------------------ Regression Model (Grade Prediction) ------------------ #
+
+def train_regressor(X, y_reg, cv=5, n_jobs=-1):
+    """Search and fit the grade tree, returning (model, metrics, test targets, test predictions).
+
+    The tree sees REGRESSOR_FEATURES only: the grade is predicted from study
+    habits, not read back from the exam score it is trained on.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X[REGRESSOR_FEATURES], y_reg, test_size=TEST_SIZE, random_state=SEED
+    )
+
+    search = GridSearchCV(
+        DecisionTreeRegressor(random_state=SEED),
+        PARAM_GRID, cv=cv, scoring='r2', n_jobs=n_jobs
+    )
+    search.fit(X_train, y_train)
+    reg = search.best_estimator_
+
+    y_pred = reg.predict(X_test)
+    mae = mean_absolute_error(y_test, y_pred)
+    mse = mean_squared_error(y_test, y_pred)
+    rmse = np.sqrt(mse)
+    r2 = r2_score(y_test, y_pred)
+
+    return reg, {
+        "best_params": search.best_params_,
+        "cv_r2": round(search.best_score_, 4),
+        "mae": round(mae, 4),
+        "mse": round(mse, 4),
+        "rmse": round(float(rmse), 4),
+        "r2": round(r2, 4)
+    }, y_test, y_pred
+
+
+def regression_holdout(reg, X, y_reg):
+    """Held-out grades and the regressor's predictions for them (same split as training)."""
+    _, X_test, _, y_test = train_test_split(X[REGRESSOR_FEATURES], y_reg, test_size=TEST_SIZE, random_state=SEED)
+    return y_test, reg.predict(X_test)
+
+
+def holdout_r2(reg, X, y_reg):
+    """R² of a trained regressor on the held-out split, as stored in the registry."""
+    return round(r2_score(*regression_holdout(reg, X, y_reg)), 4)
+
+
+# ------------------ Saving ------------------ #
+
+def save_classifier(clf, metrics, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(clf, os.path.join(out_dir, "dt_classifier.joblib"))
+    with open(os.path.join(out_dir, "accuracy.txt"), "w") as f:
+        f.write(str(metrics['accuracy']))
+
+
+def save_regressor(reg, metrics, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(reg, os.path.join(out_dir, "dt_regressor.joblib"))
+    with open(os.path.join(out_dir, "regression_r2.txt"), "w") as f:
+        f.write(str(round(metrics['r2'], 2)))
+
+
+# ------------------ Visualization ------------------ #
+
+def plot_models(clf, reg, y_test_reg, y_pred_reg, out_dir):
+    """Render the tree diagrams and the regression scatter plot to PNG files."""
+    plot_classifier(clf, out_dir)
+    plot_regressor(reg, y_test_reg, y_pred_reg, out_dir)
+
+
+def plot_classifier(clf, out_dir):
+    plt, plot_tree = _pyplot()
+    plt.figure(figsize=(12, 8))
+    plot_tree(clf, feature_names=FEATURE_NAMES, class_names=['Fail', 'Pass'], filled=True)
+    plt.title("Decision Tree - Classification (Pass/Fail)")
+    plt.savefig(os.path.join(out_dir, "decision_tree_classifier.png"))
+    plt.close()
+
+
+def plot_regressor(reg, y_test_reg, y_pred_reg, out_dir):
+    plt, plot_tree = _pyplot()
+
+    # Regression Tree
+    plt.figure(figsize=(12, 8))
+    plot_tree(reg, feature_names=REGRESSOR_FEATURES, filled=True)
+    plt.title("Decision Tree - Regression (Grade Prediction)")
+    plt.savefig(os.path.join(out_dir, "decision_tree_regressor.png"))
+    plt.close()
+
+    # Actual vs Predicted Scatter Plot
+    plt.figure(figsize=(8, 6))
+    plt.scatter(y_test_reg, y_pred_reg, alpha=0.7)
+    plt.xlabel("Actual Grades")
+    plt.ylabel("Predicted Grades")
+    plt.title("Actual vs Predicted Grades (Regression)")
+    plt.savefig(os.path.join(out_dir, "actual_vs_predicted_regression.png"))
+    plt.close()
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # headless: never open a window
+    import matplotlib.pyplot as plt
+    from sklearn.tree import plot_tree
+    return plt, plot_tree
+
+
+# ------------------ Pipeline ------------------ #
+
+def run_pipeline(csv_path=DEFAULT_CSV, out_dir="model", plot=False, cv=5, n_jobs=-1, publish=False,
+                 cache_dir=DEFAULT_CACHE_DIR):
+    """Train, evaluate and save both models; returns the training report dict."""
+    timer = StageTimer()
+    started = time.perf_counter()
+
+    with timer.stage('load'):
+        X, y_class, y_reg = load_dataset(csv_path, cache_dir)
+
+    # The two searches are independent; each also fans out over n_jobs cores
+    with timer.stage('fit'):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            clf_future = pool.submit(_timed, train_classifier, X, y_class, cv, n_jobs)
+            reg_future = pool.submit(_timed, train_regressor, X, y_reg, cv, n_jobs)
+            (clf, clf_metrics), timer.stages['fit_classifier'] = clf_future.result()
+            (reg, reg_metrics, y_test_reg, y_pred_reg), timer.stages['fit_regressor'] = reg_future.result()
+
+    # Printed after both fits so the two threads' output does not interleave
+    print("✅ Classification Accuracy:", clf_metrics['accuracy'], "%")
+    print("Best parameters:", clf_metrics['best_params'])
+    print("\nConfusion Matrix:\n", np.array(clf_metrics['confusion_matrix']))
+    print("\nClassification Report:\n", clf_metrics.pop('report'))
+
+    print("\n📈 Regression Model Performance:")
+    print("Best parameters:", reg_metrics['best_params'])
+    print("MAE:", round(reg_metrics['mae'], 2))
+    print("MSE:", round(reg_metrics['mse'], 2))
+    print("RMSE:", round(reg_metrics['rmse'], 2))
+    print("R² Score:", round(reg_metrics['r2'], 2))
+
+    with timer.stage('save'):
+        save_classifier(clf, clf_metrics, out_dir)
+        save_regressor(reg, reg_metrics, out_dir)
+
+    if plot:
+        with timer.stage('plot'):
+            plot_models(clf, reg, y_test_reg, y_pred_reg, out_dir)
+
+    version = None
+    if publish:
+        with timer.stage('publish'):
+            from model_registry import ModelRegistry
+            from tree_engine import CompiledRegressor, CompiledTree
+
+            classifier_path = os.path.join(out_dir, "dt_classifier.joblib")
+            version = ModelRegistry().publish(
+                CompiledTree.from_estimator(clf), classifier_path,
+                regressor=CompiledRegressor.from_estimator(reg),
+                regressor_source=os.path.join(out_dir, "dt_regressor.joblib"), regressor_r2=reg_metrics['r2'])
+            print(f"Published classifier as {version}")
+
+    report = {
+        "dataset": {"path": os.path.relpath(os.path.abspath(csv_path), BASE_DIR), "rows": len(X)},
+        "classifier": clf_metrics,
+        "regressor": reg_metrics,
+        "published_version": version,
+        "stages_seconds": timer.stages,
+        "total_seconds": round(time.perf_counter() - started, 4)
+    }
+    with open(os.path.join(out_dir, "training_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def _timed(func, *args):
+    """Run func(*args) and return (result, seconds taken)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the student result models")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="training data")
+    parser.add_argument('--out-dir', default="model", help="where models and reports are written")
+    parser.add_argument('--plot', action='store_true', help="render tree and regression plots (PNG)")
+    parser.add_argument('--cv', type=int, default=5, help="cross-validation folds")
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel search jobs (-1 = all cores)")
+    parser.add_argument('--publish', action='store_true', help="publish both models to the model registry")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="columnar dataset cache directory")
+    parser.add_argument('--no-cache', action='store_true', help="parse the CSV directly, bypassing the cache")
+    args = parser.parse_args()
+
+    report = run_pipeline(args.csv, args.out_dir, args.plot, args.cv, args.jobs, args.publish,
+                          None if args.no_cache else args.cache_dir)
+    print("\n⏱️ Stage timings (s):", report['stages_seconds'])
+    print(f"Training report saved to {os.path.join(args.out_dir, 'training_report.json')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Compiled decision tree inference.
+
+Flattens a fitted sklearn decision tree into compact typed arrays so a single
+row can be scored with one plain Python walk from the root to a leaf, without
+going through sklearn's input validation for every call. The pass/fail
+classifier and the grade regressor share the walk, so both can score the
+same float32 feature buffer (predict_combined_one / predict_combined).
+Random forests and binary gradient boosting compile to a CompiledEnsemble:
+the same walk once per tree over one set of concatenated node arrays.
+"""
+
+import math
+from array import array
+
+# Marker sklearn uses in children_left/children_right for leaf nodes
+LEAF = -1
+
+# Array names and typecodes that make up a compiled tree
+ARRAYS = [
+    ('feature', 'i'),
+    ('threshold', 'd'),
+    ('children_left', 'i'),
+    ('children_right', 'i'),
+    ('leaf_class', 'i'),
+    ('leaf_probability', 'd'),
+]
+
+# Array names and typecodes that make up a compiled tree ensemble
+ENSEMBLE_ARRAYS = [
+    ('feature', 'i'),
+    ('threshold', 'd'),
+    ('children_left', 'i'),
+    ('children_right', 'i'),
+    ('leaf_value', 'd'),
+    ('roots', 'i'),
+]
+
+# Array names and typecodes that make up a compiled regression tree
+REGRESSOR_ARRAYS = [
+    ('feature', 'i'),
+    ('threshold', 'd'),
+    ('children_left', 'i'),
+    ('children_right', 'i'),
+    ('leaf_value', 'd'),
+]
+
+
+def _typed(values, typecode):
+    """Keep typed buffers (arrays, mapped memoryviews) as-is, copy anything else."""
+    if isinstance(values, (array, memoryview)):
+        return values
+    return array(typecode, values)
+
+
+class _Tree:
+    """Node arrays and the root-to-leaf walk shared by both compiled tree kinds."""
+
+    def __init__(self, feature, threshold, children_left, children_right):
+        self.feature = _typed(feature, 'i')
+        self.threshold = _typed(threshold, 'd')
+        self.children_left = _typed(children_left, 'i')
+        self.children_right = _typed(children_right, 'i')
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def walk(self, x, node=0):
+        """Return the leaf reached from `node` by a float32 feature buffer (see apply_one)."""
+        feature = self.feature
+        threshold = self.threshold
+        left = self.children_left
+        right = self.children_right
+        while left[node] != LEAF:
+            if x[feature[node]] <= threshold[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return node
+
+    def apply_one(self, features):
+        """Return the index of the leaf reached by one row of features."""
+        # sklearn compares float32 inputs against float64 thresholds
+        return self.walk(array('f', features))
+
+    def apply(self, X, root=0):
+        """Return the leaf index reached from `root` by every row of a 2-D array.
+
+        Walks all rows one tree level per step, so the cost is depth-many
+        vectorized NumPy operations instead of one Python walk per row.
+        """
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float32)
+        feature = np.frombuffer(self.feature, dtype=np.intc)
+        threshold = np.frombuffer(self.threshold, dtype=np.float64)
+        left = np.frombuffer(self.children_left, dtype=np.intc)
+        right = np.frombuffer(self.children_right, dtype=np.intc)
+
+        rows = np.arange(len(X))
+        nodes = np.full(len(X), root, dtype=np.intp)
+        active = left[nodes] != LEAF
+        while active.any():
+            current = nodes[active]
+            go_left = X[rows[active], feature[current]] <= threshold[current]
+            nodes[active] = np.where(go_left, left[current], right[current])
+            active = left[nodes] != LEAF
+        return nodes
+
+
+class CompiledTree(_Tree):
+    """Array form of a fitted DecisionTreeClassifier.
+
+    Each node is described by parallel arrays (feature, threshold, left, right).
+    Leaves additionally store the index of the winning class and its
+    probability, so the label and the probability come from the same walk.
+    The arrays may be array.array objects or memoryviews over mapped files.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right,
+                 leaf_class, leaf_probability, classes):
+        super().__init__(feature, threshold, children_left, children_right)
+        self.leaf_class = _typed(leaf_class, 'i')
+        self.leaf_probability = _typed(leaf_probability, 'd')
+        self.classes = list(classes)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted sklearn DecisionTreeClassifier."""
+        tree = estimator.tree_
+        leaf_class = []
+        leaf_probability = []
+        for counts in tree.value[:, 0, :]:
+            # Older sklearn stores weighted counts, newer stores fractions
+            total = float(counts.sum())
+            best = int(counts.argmax())
+            leaf_class.append(best)
+            leaf_probability.append(float(counts[best]) / total if total else 0.0)
+        return cls(
+            tree.feature.tolist(),
+            tree.threshold.tolist(),
+            tree.children_left.tolist(),
+            tree.children_right.tolist(),
+            leaf_class,
+            leaf_probability,
+            estimator.classes_.tolist()
+        )
+
+    def outcome(self, node):
+        """(label, probability of that label) stored at a leaf."""
+        return self.classes[self.leaf_class[node]], self.leaf_probability[node]
+
+    def score(self, x):
+        """(label, probability of that label) for a float32 feature buffer."""
+        return self.outcome(self.walk(x))
+
+    def predict_one(self, features):
+        """Return (label, probability of that label) for one row of features."""
+        return self.outcome(self.apply_one(features))
+
+    def predict(self, X):
+        """Return (labels, probabilities) arrays for every row of a 2-D array."""
+        import numpy as np
+
+        nodes = self.apply(X)
+        leaf_class = np.frombuffer(self.leaf_class, dtype=np.intc)[nodes]
+        probability = np.frombuffer(self.leaf_probability, dtype=np.float64)[nodes]
+        return np.asarray(self.classes)[leaf_class], probability
+
+
+class CompiledRegressor(_Tree):
+    """Array form of a fitted DecisionTreeRegressor: the same node arrays plus each leaf's value."""
+
+    def __init__(self, feature, threshold, children_left, children_right, leaf_value):
+        super().__init__(feature, threshold, children_left, children_right)
+        self.leaf_value = _typed(leaf_value, 'd')
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted single-output sklearn DecisionTreeRegressor.
+
+        A tree fitted on a subset of the features (see REGRESSOR_FEATURES)
+        has its split features renumbered to FEATURE_NAMES positions, so it
+        walks the same full row as the classifier.
+        """
+        tree = estimator.tree_
+        feature = tree.feature.tolist()
+        names = getattr(estimator, 'feature_names_in_', None)
+        if names is not None:
+            from features import FEATURE_NAMES
+
+            positions = [FEATURE_NAMES.index(name) for name in names]
+            feature = [positions[index] if index >= 0 else index for index in feature]
+        return cls(
+            feature,
+            tree.threshold.tolist(),
+            tree.children_left.tolist(),
+            tree.children_right.tolist(),
+            tree.value[:, 0, 0].tolist()
+        )
+
+    def predict_one(self, features):
+        """Return the predicted value for one row of features."""
+        return self.leaf_value[self.apply_one(features)]
+
+    def predict(self, X):
+        """Return the predicted value for every row of a 2-D array."""
+        import numpy as np
+
+        return np.frombuffer(self.leaf_value, dtype=np.float64)[self.apply(X)]
+
+
+class CompiledEnsemble(_Tree):
+    """Array form of a fitted binary RandomForestClassifier or GradientBoostingClassifier.
+
+    The nodes of all trees are concatenated into one set of arrays (child
+    indices are global) and `roots` holds each tree's root. A row's score is
+    `base` plus the leaf values of every tree: for a forest ('mean') each
+    leaf stores its probability of classes[1] divided by the number of trees,
+    for boosting ('logistic') the learning rate times the leaf value, and the
+    summed log-odds go through the logistic function.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, leaf_value, roots,
+                 classes, kind, base=0.0):
+        super().__init__(feature, threshold, children_left, children_right)
+        self.leaf_value = _typed(leaf_value, 'd')
+        self.roots = _typed(roots, 'i')
+        self.classes = list(classes)
+        self.kind = kind
+        self.base = base
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted binary RandomForestClassifier or GradientBoostingClassifier."""
+        if len(estimator.classes_) != 2:
+            raise ValueError("Only binary ensembles can be compiled")
+        if hasattr(estimator, 'init_'):
+            kind = 'logistic'
+            rate = estimator.learning_rate
+            trees = [(tree.tree_, (tree.tree_.value[:, 0, 0] * rate).tolist())
+                     for tree in estimator.estimators_[:, 0]]
+        else:
+            kind = 'mean'
+            trees = []
+            for tree in estimator.estimators_:
+                counts = tree.tree_.value[:, 0, :]
+                totals = counts.sum(axis=1)
+                totals[totals == 0] = 1
+                trees.append((tree.tree_, (counts[:, 1] / totals / len(estimator.estimators_)).tolist()))
+
+        arrays = {name: [] for name, _ in ENSEMBLE_ARRAYS}
+        for tree, leaf_value in trees:
+            offset = len(arrays['feature'])
+            arrays['roots'].append(offset)
+            arrays['feature'] += tree.feature.tolist()
+            arrays['threshold'] += tree.threshold.tolist()
+            for name in ('children_left', 'children_right'):
+                arrays[name] += [child + offset if child != LEAF else LEAF
+                                 for child in getattr(tree, name).tolist()]
+            arrays['leaf_value'] += leaf_value
+        compiled = cls(classes=estimator.classes_.tolist(), kind=kind, **arrays)
+
+        if kind == 'logistic':
+            compiled.base = cls._initial_log_odds(estimator.init_)
+        return compiled
+
+    @staticmethod
+    def _initial_log_odds(init):
+        """Boosting's starting score: the log-odds of the class prior, or 0 for init='zero'."""
+        if init == 'zero':
+            return 0.0
+        prior = getattr(init, 'class_prior_', None)
+        if getattr(init, 'strategy', None) != 'prior' or prior is None:
+            raise ValueError("Only boosting started from the class prior or zero can be compiled")
+        return math.log(prior[1] / prior[0])
+
+    @property
+    def tree_count(self):
+        return len(self.roots)
+
+    def raw_score(self, x):
+        total = self.base
+        leaf_value = self.leaf_value
+        for root in self.roots:
+            total += leaf_value[self.walk(x, root)]
+        return total
+
+    def _label(self, positive):
+        # Ties go to the first class, as in sklearn's argmax
+        if positive > 0.5:
+            return self.classes[1], positive
+        return self.classes[0], 1.0 - positive
+
+    def score(self, x):
+        """(label, probability of that label) for a float32 feature buffer."""
+        raw = self.raw_score(x)
+        return self._label(raw if self.kind == 'mean' else 1.0 / (1.0 + math.exp(-raw)))
+
+    def predict_one(self, features):
+        """Return (label, probability of that label) for one row of features."""
+        return self.score(array('f', features))
+
+    def predict(self, X):
+        """Return (labels, probabilities) arrays for every row of a 2-D array."""
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float32)
+        leaf_value = np.frombuffer(self.leaf_value, dtype=np.float64)
+        raw = np.full(len(X), self.base)
+        for root in self.roots:
+            raw += leaf_value[self.apply(X, root)]
+        positive = raw if self.kind == 'mean' else 1.0 / (1.0 + np.exp(-raw))
+        first = positive <= 0.5
+        labels = np.asarray(self.classes)[np.where(first, 0, 1)]
+        return labels, np.where(first, 1.0 - positive, positive)
+
+
+def compile_classifier(estimator):
+    """Compile a fitted decision tree, random forest or gradient boosting classifier."""
+    if hasattr(estimator, 'estimators_'):
+        return CompiledEnsemble.from_estimator(estimator)
+    return CompiledTree.from_estimator(estimator)
+
+
+def predict_combined_one(classifier, regressor, features):
+    """(label, probability, grade) for one row; grade is None without a regressor.
+
+    The row is converted to float32 once and both trees walk that buffer.
+    """
+    x = array('f', features)
+    label, probability = classifier.score(x)
+    grade = regressor.leaf_value[regressor.walk(x)] if regressor is not None else None
+    return label, probability, grade
+
+
+def predict_combined(classifier, regressor, X):
+    """(labels, probabilities, grades or None) for a 2-D array, converted to float32 once."""
+    import numpy as np
+
+    X = np.asarray(X, dtype=np.float32)
+    labels, probabilities = classifier.predict(X)
+    return labels, probabilities, regressor.predict(X) if regressor is not None else None